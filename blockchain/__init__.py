@@ -2,11 +2,22 @@
 # -*- coding: utf-8 -*-
 
 import os
-from typing import Dict, List, Optional, Union
-from pydantic import UUID4
-from importlib_metadata import metadata
+
+try:
+    from importlib.metadata import metadata
+except ImportError:  # Python<3.8
+    from importlib_metadata import metadata
 
 # all metadata defined in setup.py accessible from package for reuse
 package = os.path.basename(os.path.dirname(__file__))
-__meta__ = metadata(package)
-__title__ = __meta__["Description"].splitlines()[0].replace("# ", "")
+
+
+def __getattr__(name):
+    # metadata lookup is costly, only resolve it when actually requested (PEP 562)
+    if name in ["__meta__", "__title__"]:
+        meta = metadata(package)
+        globals()["__meta__"] = meta
+        title = meta["Description"].partition("\n")[0].rstrip("\r")  # avoid splitting the full README
+        globals()["__title__"] = title[2:] if title.startswith("# ") else title
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
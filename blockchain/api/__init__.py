@@ -1,17 +1,16 @@
-import importlib
 import os
 from typing import TYPE_CHECKING, List, Optional
 from typing_extensions import Literal
-from urllib.parse import urljoin
 
+import orjson
 import yaml
 from fastapi import APIRouter, Request, Response
 from fastapi.encoders import jsonable_encoder
 from pydantic import AnyUrl
 
-from blockchain import __meta__
 from blockchain.api import schemas
 from blockchain.database import Database
+from blockchain.utils import get_package_version, json_response
 
 # shortcuts for top-level app
 from blockchain.api.block import BLOCK
@@ -19,20 +18,34 @@ from blockchain.api.chain import CHAIN
 from blockchain.api.nodes import NODES
 from blockchain.ui.views import MAKO, VIEWS
 
+try:
+    from yaml import CSafeDumper as YamlDumper  # C implementation when LibYAML is available
+except ImportError:
+    from yaml import SafeDumper as YamlDumper
+
 if TYPE_CHECKING:
     from blockchain.app import BlockchainWebApp
 
 MAIN = APIRouter()
 
+# relation, title, route name and query of the links generated on the frontpage
+FRONTPAGE_LINKS = [
+    ("api", "OpenAPI documentation.", "swagger_ui_html", ""),
+    ("json", "OpenAPI schemas (JSON).", "openapi_schema", ""),
+    ("yaml", "OpenAPI schemas (YAML).", "openapi_schema", "?f=yaml"),
+    ("ui", "User interface.", "shortcut_navigate", ""),
+    ("nodes", "Registered network nodes.", "list_nodes", ""),
+]
+
 
 @MAIN.get(
     "/",
     tags=["API"],
     summary="Details of this blockchain node.",
-    response_model=schemas.FrontpageResponse,
     responses={
         200: {
-            "description": "Landing page of the Blockchain Node API."
+            "description": "Landing page of the Blockchain Node API.",
+            "model": schemas.FrontpageResponse,  # documentation only, body is not validated against it
         }
     }
 )
@@ -40,21 +53,18 @@ async def frontpage(request: Request):
     """
     Landing page of the Blockchain Node API.
     """
-    base = str(request.url)
+    links = [
+        {"rel": rel, "title": title, "href": f"{request.url_for(name)!s}{query}"}
+        for rel, title, name, query in FRONTPAGE_LINKS
+    ]
+    links.append({"rel": "self", "title": "API entrypoint.", "href": str(request.url)})
     body = {
         "message": "Blockchain Node",
         "node": request.app.node.id,
-        "version": __meta__["version"],
-        "links": [
-            {"rel": "api", "title": "OpenAPI documentation.", "href": urljoin(base, "/api")},
-            {"rel": "json", "title": "OpenAPI schemas (JSON).", "href": urljoin(base, "/schema")},
-            {"rel": "yaml", "title": "OpenAPI schemas (YAML).", "href": urljoin(base, "/schema?f=yaml")},
-            {"rel": "ui", "title": "User interface.", "href": urljoin(base, "/ui")},
-            {"rel": "nodes", "title": "Registered network nodes.", "href": urljoin(base, "/nodes")},
-            {"rel": "self", "title": "API entrypoint.", "href": base}
-        ]
+        "version": get_package_version(),
+        "links": links,
     }
-    return body
+    return json_response(body)
 
 
 @MAIN.get("/schema", tags=["API"], responses={
@@ -80,12 +90,32 @@ async def openapi_schema(
     format: Literal["json", "yaml"] = schemas.FormatQuery("json"),
 ):
     app = request.app  # type: "BlockchainWebApp"
+    out_format = f or format
+    content = get_openapi_contents(app, out_format)
+    if out_format == "yaml":
+        return Response(content, media_type="text/plain; charset=utf-8")
+    return Response(content, media_type="application/json")
+
+
+def get_openapi_contents(app: "BlockchainWebApp", out_format: Literal["json", "yaml"]) -> bytes:
+    """
+    Obtain the rendered OpenAPI schema of the application in the requested format.
+
+    Since the schema cannot change once the application is started, it is rendered only once per format
+    and the resulting contents are reused for following requests.
+    """
+    if app.openapi_contents is None:
+        app.openapi_contents = {}
+    content = app.openapi_contents.get(out_format)
+    if content is not None:
+        return content
     oas = app.openapi()
-    if (f or format) == "yaml":
+    if out_format == "yaml":
         data = jsonable_encoder(oas)
         # FIXME: patch contact URL (https://github.com/tiangolo/fastapi/issues/1071)
         data["info"]["contact"]["url"] = str(data["info"]["contact"]["url"])
-        text = yaml.safe_dump(data)
-        resp = Response(text, media_type="text/plain; charset=utf-8")
-        return resp
-    return oas
+        content = yaml.dump(data, Dumper=YamlDumper, sort_keys=False).encode("utf-8")
+    else:
+        content = orjson.dumps(jsonable_encoder(oas))
+    app.openapi_contents[out_format] = content
+    return content
@@ -2,27 +2,28 @@ from fastapi import APIRouter, Request
 
 from blockchain.api import schemas
 from blockchain.api.chain import get_block
-from blockchain.typedefs import AnyRef
+from blockchain.typedefs import IndexOrUUID
+from blockchain.utils import json_response
 
 BLOCK = APIRouter(prefix="/blocks")
 
 
 @BLOCK.get(
-    "/{block_ref}",
+    "/{block_ref:anyref}",
     tags=["Blocks"],
     summary="Obtain the details of a specific block across blockchains.",
-    response_model=schemas.ChainBlockResponse,
     responses={
         200: {
-            "description": "Block details."
+            "description": "Block details.",
+            "model": schemas.ChainBlockResponse,
         }
     }
 )
-async def find_block(request: Request, block_ref: AnyRef = schemas.BlockPathRef(...)):
+async def find_block(request: Request, block_ref: IndexOrUUID = schemas.BlockPathRef(...)):
     block, chain = get_block(request.app, block_ref)
     data = {
         "message": "Listing of block details successful.",
-        "chain": chain.id,
-        "block": block
+        "chain": str(chain.id),
+        "block": block.as_json
     }
-    return data
+    return json_response(data)
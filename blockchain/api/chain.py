@@ -1,16 +1,31 @@
+import asyncio
+import functools
 import json
+import threading
 import uuid
-from typing import TYPE_CHECKING, List, Optional, Tuple, Union
-from urllib.parse import urljoin
-
-import requests
-from fastapi import APIRouter, HTTPException, Request
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+import httpx
+import orjson
+from cachetools import TTLCache
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, UUID4
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from blockchain.api import schemas
-from blockchain.impl import Base, Block, Blockchain, ConsentChange, Node
-from blockchain.typedefs import AnyRef, AnyUUID
-from blockchain.utils import get_logger, parse_multipart_consents
+from blockchain.impl import Block, Blockchain, ConsentChange, Node
+from blockchain.typedefs import AnyRef, AnyUUID, IndexOrUUID, JSON
+from blockchain.utils import (
+    UUID_REGEX,
+    etag_matches,
+    get_logger,
+    json_dumps,
+    json_response,
+    parse_index_or_uuid,
+    parse_multipart_consents
+)
 
 if TYPE_CHECKING:
     from blockchain.app import BlockchainWebApp
@@ -19,6 +34,16 @@ LOGGER = get_logger(__name__)
 
 CHAIN = APIRouter(prefix="/chains")
 
+# short-lived results of remote verifications to serve bursts of consents requests without querying every node
+OUTDATED_CACHE = TTLCache(maxsize=1024, ttl=5)  # type: TTLCache[Tuple[uuid.UUID, uuid.UUID], Optional[bool]]
+OUTDATED_CACHE_LOCK = threading.Lock()
+# short-lived results of blockchain existence probes on remote nodes, only accessed from the event loop
+PROBE_CACHE = TTLCache(maxsize=8192, ttl=5)  # type: TTLCache[Tuple[str, str], bool]
+# maximum blockchain references per batch request, about 3.7 KB of UUIDs to remain well within request line limits
+BATCH_CHAINS_MAX = 100
+# JSON schema of consents update requests generated once for all representations of the request body
+CONSENT_REQUEST_SCHEMA = schemas.ConsentRequestBody.schema(ref_template="#/components/schemas/{model}")
+
 
 def get_chain(app: "BlockchainWebApp", chain_id: UUID4, allow_missing: bool = False) -> Optional[Blockchain]:
     """
@@ -34,6 +59,17 @@ def get_chain(app: "BlockchainWebApp", chain_id: UUID4, allow_missing: bool = Fa
     return app.blockchains[chain_id]
 
 
+def get_chain_etag(chain: Blockchain) -> str:
+    """
+    Generate a weak entity tag of the blockchain that changes whenever blocks are added or replaced.
+
+    The tag is derived from the chain contents only, such that it remains valid across restarts and between nodes.
+    """
+    blocks = chain.blocks
+    last_block_id = blocks[-1].id if blocks else None
+    return f'W/"{chain.id}-{last_block_id}-{len(blocks)}"'
+
+
 def get_block(app: "BlockchainWebApp",
               block_ref: AnyRef,
               chain: Blockchain = None,
@@ -47,58 +83,224 @@ def get_block(app: "BlockchainWebApp",
     :raises: block cannot be found or reference is invalid.
     :returns: matched block, also returns the chain it was found in if not provided as input.
     """
-    if chain and str.isnumeric(block_ref):
-        block_ref = int(block_ref)
+    if isinstance(block_ref, str):
+        try:
+            block_ref = parse_index_or_uuid(block_ref)
+        except ValueError:
+            raise HTTPException(400, f"Block reference not a valid UUID or numeric index [{block_ref!s}]")
+    if isinstance(block_ref, int):
+        if not chain:
+            raise HTTPException(400, f"Block reference as numeric index requires a blockchain [{block_ref!s}]")
         if block_ref < 0 or block_ref >= len(chain.blocks):
             raise HTTPException(400, f"Block reference as numeric index out of range [0, {len(chain.blocks)}].")
         return chain.blocks[block_ref]
-    try:
-        block_ref = UUID4(block_ref)
-    except (TypeError, ValueError):
-        raise HTTPException(400, f"Block reference not a valid UUID [{block_ref!s}]")
-    blockchains = [chain] if chain else app.blockchains.values()
-    for chain_search in blockchains:
-        for block in chain_search.blocks:
-            if block.id == block_ref:
-                return block if chain else (block, chain_search)
+    if chain:
+        block = chain.find_block(block_ref)
+        if block is not None:
+            return block
+    else:
+        found = app.blockchains.find_block(block_ref)
+        if found is not None:
+            return found
     raise HTTPException(404, f"Block reference UUID [{block_ref!s}] not found in chain.")
 
 
-def get_chain_links(request: Request, chain_id: AnyUUID) -> List[schemas.Link]:
+# relation and route name of API links relevant for a blockchain
+CHAIN_LINK_ROUTES = [
+    # order important as employed for nicer display in UI
+    ("self", "view_chain"),  # first position important
+    ("blocks", "list_blocks"),
+    ("consents", "view_consents"),
+    ("consensus", "consensus"),
+    # ("transaction", "new_transaction"),  # only POST
+    ("mine", "mine"),
+]
+
+
+@functools.lru_cache(maxsize=None)
+def get_chain_link_templates() -> List[Tuple[str, str]]:
     """
-    Obtain all API links relevant for the blockchain.
+    Obtain the path templates of API links relevant for a blockchain, resolved only once from the router.
     """
-    chain_id = str(chain_id)
-    links = [
-        # order important as employed for nicer display in UI
-        {"rel": "self", "href": request.url_for("view_chain", chain_id=chain_id)},  # first position important
-        {"rel": "blocks", "href": request.url_for("list_blocks", chain_id=chain_id)},
-        {"rel": "consents", "href": request.url_for("view_consents", chain_id=chain_id)},
-        {"rel": "consensus", "href": request.url_for("consensus", chain_id=chain_id)},
-        # {"rel": "transaction", "href": url_for("chain.new_transaction", chain_id=chain_id)},  # only POST
-        {"rel": "mine", "href": request.url_for("mine", chain_id=chain_id)},
-    ]  # type: List[Dict[str, str]]
-    for link in links:
-        link["href"] = urljoin(str(request.url), link["href"])
-        link["title"] = link["rel"].capitalize()
-    return links
+    paths = {route.name: route.path_format for route in CHAIN.routes}
+    return [(rel, paths[name]) for rel, name in CHAIN_LINK_ROUTES]
 
 
-def check_blockchain_exists(node: Node, chain_id: AnyUUID) -> bool:
+def get_chain_links(request: Request, chain_id: AnyUUID) -> List[schemas.Link]:
+    """
+    Obtain all API links relevant for the blockchain.
+
+    Links are generated once per base URL and blockchain of the application. Copies are returned such that callers can adjust them.
+    """
+    base_url = str(request.base_url).rstrip("/")
+    key = (base_url, str(chain_id))
+    links = request.app.chain_links.get(key)
+    if links is None:
+        links = [
+            {"rel": rel, "href": base_url + path.format(chain_id=chain_id), "title": rel.capitalize()}
+            for rel, path in get_chain_link_templates()
+        ]  # type: List[Dict[str, str]]
+        request.app.chain_links[key] = links
+    return [dict(link) for link in links]
+
+
+async def check_blockchain_exists(app: "BlockchainWebApp", node: Node, chain_id: AnyUUID) -> bool:
     """
     Verifies if a blockchain reference can be found on a remote node.
 
     If the reference can be found, the blockchain is initiated for
+    Results are reused for a few seconds to avoid probing the node again for bursts of resolution requests.
     """
+    key = (node.url, str(chain_id))
+    exists = PROBE_CACHE.get(key)
+    if exists is not None:
+        return exists
     try:
-        resp = requests.get(f"{node.url}/chains/{chain_id}", timeout=2)
-    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+        resp = await app.http.get(f"{node.url}/chains/{chain_id}")
+    except httpx.HTTPError:
         LOGGER.info("Node [%s] does not know blockchain [%s] for initial creation.", node, chain_id)
-        return False
-    if resp.status_code == 200:
-        LOGGER.info("Node [%s] knows blockchain [%s] for initial creation.", node, chain_id)
-        return True
-    return False
+        exists = False
+    else:
+        exists = resp.status_code == 200
+        if exists:
+            LOGGER.info("Node [%s] knows blockchain [%s] for initial creation.", node, chain_id)
+    PROBE_CACHE[key] = exists
+    return exists
+
+
+async def get_remote_chains(app: "BlockchainWebApp", node: Node) -> Set[str]:
+    """
+    Obtains the blockchain references known by a remote node, without further resolution on its side.
+    """
+    try:
+        resp = await app.http.get(f"{node.url}/chains", params={"resolve": "false"})
+    except httpx.HTTPError:
+        LOGGER.info("Node [%s] did not answer to provide blockchains for initial creation.", node)
+        return set()
+    if resp.status_code != 200:
+        LOGGER.info("Node [%s] responded with invalid code [%s] to provide blockchains.", node, resp.status_code)
+        return set()
+    try:
+        chains = orjson.loads(resp.content)["chains"]
+        return {chain.lower() for chain in chains if isinstance(chain, str) and UUID_REGEX.match(chain)}
+    except (orjson.JSONDecodeError, KeyError, TypeError):
+        LOGGER.info("Node [%s] responded with an invalid listing of blockchains.", node)
+        return set()
+
+
+async def get_remote_chains_blocks(app: "BlockchainWebApp", node: Node, chain_ids: Iterable[str]) -> Dict[str, JSON]:
+    """
+    Obtains the detailed blocks of multiple blockchains known by a remote node with as few requests as possible.
+
+    References are sent by groups of at most :data:`BATCH_CHAINS_MAX` to keep the query within request line limits.
+    """
+    chain_ids = list(chain_ids)
+    batches = [chain_ids[index:index + BATCH_CHAINS_MAX] for index in range(0, len(chain_ids), BATCH_CHAINS_MAX)]
+    chains = {}
+    for batch in batches:
+        try:
+            resp = await app.http.get(f"{node.url}/chains/batch", params={"ids": ",".join(batch)})
+        except httpx.HTTPError:
+            LOGGER.info("Node [%s] did not answer to provide blockchains for initial creation.", node)
+            break
+        if resp.status_code != 200:
+            # nodes of older versions without batch support, remaining chains are resolved individually
+            break
+        try:
+            chains.update(orjson.loads(resp.content)["chains"])
+        except (orjson.JSONDecodeError, KeyError, TypeError):
+            LOGGER.info("Node [%s] responded with invalid blockchains details.", node)
+            break
+    return chains
+
+
+async def resolve_chain(app: "BlockchainWebApp", chain_id: UUID4) -> Tuple[Blockchain, bool, bool, List[Node]]:
+    """
+    Resolves a blockchain with consensus against other nodes, generating it if it is only available remotely.
+
+    Remote nodes are all queried concurrently when searching for a missing blockchain.
+
+    :raises: blockchain is missing and cannot be found on any remote node.
+    :returns: resolved blockchain, whether it was generated, whether it was replaced, and validated nodes.
+    """
+    nodes = app.nodes or []
+    blockchain = get_chain(app, chain_id, allow_missing=True)
+    generated = False
+    if not blockchain:
+        # special case of "first pull" of an entirely missing blockchain reference locally, but available elsewhere
+        # when node doesn't have any block yet (eg: just created node/chain), fetch full definition if possible
+        if not nodes:
+            raise HTTPException(404, f"Blockchain [{chain_id!s}] not found and cannot be resolved (no blockchain nodes available).")
+        checks = [asyncio.ensure_future(check_blockchain_exists(app, node, chain_id)) for node in nodes]
+        try:
+            for check in asyncio.as_completed(checks):
+                if await check:
+                    # setup blockchain, but resolve conflicts with consensus instead of initialization
+                    blockchain = Blockchain(id=chain_id, genesis_block=False)
+                    generated = True
+                    break
+        finally:
+            for check in checks:
+                check.cancel()  # remaining checks are not needed anymore when a match was found or on error
+        if blockchain is None:
+            raise HTTPException(404, f"Blockchain [{chain_id!s}] not found and cannot be resolved from other blockchain nodes.")
+
+    replaced, validated = await run_in_threadpool(blockchain.resolve_conflicts, nodes)
+    if generated:
+        app.blockchains[chain_id] = blockchain  # apply resolved generation
+    app.db.enqueue_save(blockchain)
+    return blockchain, generated, replaced, validated
+
+
+def get_chains_listing(app: "BlockchainWebApp") -> bytes:
+    """
+    Obtain the serialized listing of blockchains available on this node, without resolution against remote nodes.
+    """
+    chains = app.blockchains
+    listing = app.chains_listings.get(chains.version)
+    if listing is None:
+        data = {
+            "chains": list(chains),
+            "total": len(chains),
+            "resolved_query": False,
+            "resolved_nodes": 0,
+            "resolved_chains": 0,
+        }
+        listing = app.chains_listings[chains.version] = json_dumps(data)
+    return listing
+
+
+class ChainListMiddleware:
+    """
+    Serves the listing of local blockchains directly, bypassing routing, validation and request/response objects.
+
+    Only plain ``GET /chains`` requests are handled, any other request (including remote resolution) is passed down.
+    """
+    paths = frozenset(["/chains", "/chains/"])
+    queries = frozenset([b"", b"resolve=false"])
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] == "http"
+            and scope["method"] == "GET"
+            and scope["path"] in self.paths
+            and scope["query_string"] in self.queries
+        ):
+            body = get_chains_listing(scope["app"])
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+        await self.app(scope, receive, send)
 
 
 @CHAIN.get(
@@ -110,97 +312,206 @@ def check_blockchain_exists(node: Node, chain_id: AnyUUID) -> bool:
     }
 )
 async def list_chains(request: Request, resolve: bool = False):
-    chains = set(request.app.blockchains)
-    str_chains = {str(chain) for chain in chains}
+    app = request.app  # type: BlockchainWebApp
+    if not resolve:
+        return Response(get_chains_listing(app), media_type="application/json")
+    str_chains = {str(chain) for chain in app.blockchains}
     new_chains = set()
 
-    resolved_nodes = 0
-    if resolve:
-        LOGGER.info("Resolving missing chains with remote nodes...")
-        for node in APP.nodes:
-            if node.resolved:
-                resolved_nodes += 1
-                try:
-                    resp = requests.get(f"{node.url}/chains?resolve=false", timeout=2)
-                    node_chains = set(resp.json()["chains"])
-                    new_chains |= node_chains - str_chains
-                except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
-                    LOGGER.info("Node [%s] did not answer to provide blockchains for initial creation.", node)
+    LOGGER.info("Resolving missing chains with remote nodes...")
+    nodes = [node for node in app.nodes or [] if node.resolved]
+    resolved_nodes = len(nodes)
+    for node_chains in await asyncio.gather(*[get_remote_chains(app, node) for node in nodes]):
+        new_chains |= node_chains - str_chains
+    LOGGER.info("Found %s missing chains", len(new_chains))
+    resolved = []  # type: List[Blockchain]
+    if new_chains:
+        chain_ids = sorted(new_chains)
+        batches = await asyncio.gather(*[get_remote_chains_blocks(app, node, chain_ids) for node in nodes])
+        candidates = {}  # type: Dict[str, List[Tuple[int, List[JSON]]]]
+        for node, batch in zip(nodes, batches):
+            for chain, body in batch.items():
+                # skip anything unexpected the same way as unresponsive nodes, remaining ones are resolved individually
+                if (
+                    chain not in new_chains
+                    or not isinstance(body, dict)
+                    or not isinstance(body.get("length"), int)
+                    or isinstance(body.get("length"), bool)
+                    or not isinstance(body.get("blocks"), list)
+                ):
+                    LOGGER.warning("Node [%s] provided invalid blocks for chain [%s]. Skipping them.", node, chain)
                     continue
-        LOGGER.info("Found %s missing chains", len(new_chains))
-        for chain in new_chains:
-            consensus(chain_id=chain)
+                candidates.setdefault(chain, []).append((body["length"], body["blocks"]))
+        resolved = await run_in_threadpool(generate_chains, candidates)
+        for blockchain in resolved:
+            app.blockchains[blockchain.id] = blockchain
+            app.db.enqueue_save(blockchain)
+        LOGGER.info("Generated %s missing chains from batched remote blocks", len(resolved))
+    for chain in new_chains - {str(blockchain.id) for blockchain in resolved}:
+        try:
+            await resolve_chain(app, uuid.UUID(chain))
+        except HTTPException as exc:
+            LOGGER.warning("Missing chain [%s] could not be resolved: %s", chain, exc.detail)
 
     chains = list(request.app.blockchains)
     data = {
         "chains": chains,
         "total": len(chains),
-        "resolved_query": resolve,
+        "resolved_query": True,
         "resolved_nodes": resolved_nodes,
         "resolved_chains": len(new_chains),
     }
-    return data
+    return json_response(data)
+
+
+def generate_chains(candidates: Dict[str, List[Tuple[int, List[JSON]]]]) -> List[Blockchain]:
+    """
+    Generate blockchains from the longest valid candidate blocks obtained from remote nodes.
+    """
+    chains = []
+    for chain_id, chain_candidates in candidates.items():
+        blockchain = Blockchain(id=uuid.UUID(chain_id), genesis_block=False)
+        try:
+            replaced = blockchain.replace_longest(chain_candidates)
+        except (KeyError, TypeError, ValueError) as exc:
+            LOGGER.warning("Invalid candidate blocks for chain [%s]: %s", chain_id, exc)
+            continue
+        if replaced:
+            chains.append(blockchain)
+    return chains
+
+
+@CHAIN.get(
+    "/batch",
+    tags=["Chains"],
+    summary="Obtain full details of blocks of multiple blockchains at once.",
+    responses={
+        200: {"description": "Detailed blocks of the requested blockchains that are available on this node."}
+    }
+)
+async def batch_chains(request: Request, ids: str = Query(..., description="Comma-separated blockchain UUIDs.")):
+    chain_ids = ids.split(",")
+    if len(chain_ids) > BATCH_CHAINS_MAX:
+        raise HTTPException(400, f"Too many blockchain references, at most {BATCH_CHAINS_MAX} are allowed per request.")
+    chains = {}
+    for chain_id in chain_ids:
+        if not UUID_REGEX.match(chain_id):
+            raise HTTPException(400, f"Blockchain reference not a valid UUID [{chain_id!s}]")
+        chain = get_chain(request.app, uuid.UUID(chain_id), allow_missing=True)
+        if chain is not None:
+            blocks = list(chain.blocks)
+            chains[chain_id] = {"blocks": blocks, "length": len(blocks)}
+    return json_response({"chains": chains})
 
 
 @CHAIN.get(
     "/{chain_id}",
     tags=["Chains"],
     summary="Obtain the list of blocks that constitute a blockchain.",
-    response_model=schemas.ChainSummaryResponse,
     responses={
         200: {
-            "description": "Summary of blocks that constitute a blockchain."
+            "description": "Summary of blocks that constitute a blockchain.",
+            "model": schemas.ChainSummaryResponse,
         }
     }
 )
 async def view_chain(request: Request, chain_id: UUID4):
     chain = get_chain(request.app, chain_id)
-    data = {
-        "chain": chain.data(detail=False),
-        "length": len(chain.blocks),
-        "links": get_chain_links(request, chain_id)
-    }
-    return data
+    etag = get_chain_etag(chain)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    key = (chain.id, etag, str(request.base_url))
+    body = request.app.chain_views.get(key)
+    if body is None:
+        data = {
+            "chain": chain.summary(),
+            "length": len(chain.blocks),
+            "links": get_chain_links(request, chain_id)
+        }
+        body = request.app.chain_views[key] = json_dumps(data)
+    return Response(body, headers={"ETag": etag}, media_type="application/json")
 
 
 @CHAIN.get(
     "/{chain_id}/blocks",
     tags=["Chains", "Blocks"],
     summary="Obtain full details of blocks that constitute a blockchain.",
-    response_model=Union[schemas.ChainConsentsDetailedResponse, schemas.ChainConsentsSummaryResponse],
     responses={
         200: {
-            "description": "Blocks that form the blockchain."
+            "description": "Blocks that form the blockchain.",
+            "model": Union[schemas.ChainConsentsDetailedResponse, schemas.ChainConsentsSummaryResponse],
         }
     }
 )
 async def list_blocks(request: Request, chain_id: UUID4, detail: bool = schemas.DetailQuery(False)):
     chain = get_chain(request.app, chain_id)
-    blocks = list(chain.blocks) if detail else [block.id for block in chain.blocks]
-    data = Base({"blocks": blocks, "length": len(blocks)})
-    return data
+    if detail:
+        blocks = list(chain.blocks)  # copy to avoid listing blocks added while streaming
+        return StreamingResponse(stream_blocks(blocks), media_type="application/json")
+    # detailed blocks are not tagged since their consents can expire without the chain being modified
+    etag = get_chain_etag(chain)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    key = (chain.id, etag)
+    body = request.app.chain_blocks.get(key)
+    if body is None:
+        data = {"blocks": chain.block_ids, "length": len(chain.block_ids)}
+        body = request.app.chain_blocks[key] = json_dumps(data)
+    return Response(body, headers={"ETag": etag}, media_type="application/json")
+
+
+def stream_blocks(blocks: List[Block]) -> Iterator[bytes]:
+    """
+    Generate the JSON listing of detailed blocks progressively to avoid rendering the whole chain in memory at once.
+    """
+    yield b'{"blocks":['
+    for index, block in enumerate(blocks):
+        separator = b"," if index else b""
+        yield separator + json_dumps(block)
+    yield b'],"length":%d}' % len(blocks)
 
 
 @CHAIN.get(
-    "/{chain_id}/blocks/{block_ref}",
+    "/{chain_id}/blocks/{block_ref:anyref}",
     summary="Obtain the details of a specific block within a blockchain.",
     tags=["Chains", "Blocks"],
-    response_model=schemas.ChainBlockResponse,
     responses={
         200: {
-            "description": "Detail of a block within a chain."
+            "description": "Detail of a block within a chain.",
+            "model": schemas.ChainBlockResponse,
         }
     }
 )
-async def chain_block(request: Request, chain_id: UUID4, block_ref: AnyRef = schemas.BlockPathRef(...)):
+async def chain_block(request: Request, chain_id: UUID4, block_ref: IndexOrUUID = schemas.BlockPathRef(...)):
     chain = get_chain(request.app, chain_id)
     block = get_block(request.app, block_ref, chain)
-    data = Base({
+    data = {
         "message": "Listing of block details successful.",
         "chain": chain.id,
         "block": block
-    })
-    return data
+    }
+    return json_response(data)
+
+
+def forge_block(app: "BlockchainWebApp",
+                blockchain: Blockchain,
+                fields: List[str],
+                stage: Callable[[], Any],
+                ) -> Response:
+    """
+    Mine the new block with pending changes by adding it to the chain, and report the requested block fields.
+
+    The changes applied by ``stage`` and the mined block are handled under the chain lock, such that concurrent
+    requests cannot mine against the same last block nor reset the pending changes in between.
+    """
+    with blockchain.lock:
+        stage()
+        block = blockchain.mine_block()
+        app.db.enqueue_save(blockchain)
+
+    data = {"message": "New block forged."}
+    data.update({field: block[field] for field in fields})
+    return json_response(data, status_code=201)
 
 
 @CHAIN.get(
@@ -214,33 +525,22 @@ async def chain_block(request: Request, chain_id: UUID4, block_ref: AnyRef = sch
         }
     }
 )
-async def mine(request: Request, chain_id: UUID4):
-    # We run the proof of work algorithm to get the next proof...
+def mine(request: Request, chain_id: UUID4):
+    # not a coroutine to run the compute-bound proof of work in the threadpool instead of blocking the event loop
     blockchain = get_chain(request.app, chain_id)
-    last_block = blockchain.last_block
-    proof = blockchain.proof_of_work(last_block)
 
     # We must receive a reward for finding the proof.
     # The sender is "0" to signify that this node has mined a new coin.
-    blockchain.new_transaction(
+    reward = functools.partial(
+        blockchain.new_transaction,
         sender="0",
         recipient=request.app.node,
         amount=1,
     )
 
-    # Forge the new Block by adding it to the chain
-    previous_hash = blockchain.hash(last_block)
-    block = blockchain.new_block(proof, previous_hash)
-    request.app.db.save_chain(blockchain)
-
-    data = Base({
-        "message": "New block forged.",
-        "index": block["index"],
-        "transactions": block["transactions"],
-        "proof": block["proof"],
-        "previous_hash": block["previous_hash"],
-    })
-    return data
+    # We run the proof of work algorithm to get the next proof and forge the block with it
+    fields = ["index", "transactions", "proof", "previous_hash"]
+    return forge_block(request.app, blockchain, fields, reward)
 
 
 @CHAIN.post(
@@ -254,10 +554,14 @@ async def mine(request: Request, chain_id: UUID4):
         }
     }
 )
-async def new_transaction(request: Request, values: schemas.TransactionSchema, chain_id: UUID4):
-    index = get_chain(request.app, chain_id).new_transaction(values["sender"], values["recipient"], values["amount"])
+def new_transaction(request: Request, values: schemas.TransactionSchema, chain_id: UUID4):
+    # body already parsed and validated against the schema by FastAPI
+    # not a coroutine since the chain lock can be held for the whole proof of work of a concurrent mining request
+    blockchain = get_chain(request.app, chain_id)
+    with blockchain.lock:
+        index = blockchain.new_transaction(values.sender, values.recipient, values.amount)
     data = {"message": f"Transaction will be added to Block {index}"}
-    return data
+    return json_response(data, status_code=201)
 
 
 @CHAIN.get(
@@ -270,25 +574,55 @@ async def new_transaction(request: Request, values: schemas.TransactionSchema, c
         }
     }
 )
-async def view_consents(request: Request, chain_id: UUID4):
+def view_consents(request: Request, chain_id: UUID4):
+    # not a coroutine to run blocking requests to remote nodes in the threadpool instead of blocking the event loop
     chain = get_chain(request.app, chain_id)
-    summary, history = ConsentChange.history(chain)
-    consents = [consent.json() for consent in ConsentChange.latest(chain)]
-    outdated = chain.verify_outdated(request.app.nodes)
+    data = get_consents(request.app, chain)
+    return json_response(data)
+
+
+def verify_outdated(app: "BlockchainWebApp", chain: Blockchain) -> Optional[bool]:
+    """
+    Verifies if the blockchain is outdated against other nodes, reusing any result obtained very recently.
+
+    .. seealso::
+        :meth:`Blockchain.verify_outdated`
+    """
+    key = (chain.id, chain.last_block.id)
+    with OUTDATED_CACHE_LOCK:
+        if key in OUTDATED_CACHE:
+            return OUTDATED_CACHE[key]
+    outdated = chain.verify_outdated(app.nodes or [])
+    with OUTDATED_CACHE_LOCK:
+        OUTDATED_CACHE[key] = outdated
+    return outdated
+
+
+def get_consents(app: "BlockchainWebApp", chain: Blockchain) -> JSON:
+    """
+    Resolves the latest consents and their change history in the blockchain, verified against other nodes.
+    """
+    # resolved states are shared by concurrent requests, copy them while no other one can update them
+    with chain.consents_lock:
+        summary, history = ConsentChange.history(chain)
+        summary = list(summary)
+        changes = [change.json() for change in history]
+        consents = [consent.json() for consent in ConsentChange.latest(chain)]
+    outdated = verify_outdated(app, chain)
     message = "Consents history resolved and validated against all other nodes."
     if outdated is None:
         message = "Consents history resolved but could not be validated against other nodes."
     elif outdated:
         message = "Consents history resolved but is missing updates from other nodes."
-    data = Base({
+    data = {
         "message": message,
         "updated": chain.last_block.created.isoformat(),
         "outdated": outdated if isinstance(outdated, bool) else False,
         "verified": outdated is not None,
         "summary": summary,
-        "changes": [change.json() for change in history],
+        "changes": changes,
         "consents": consents,
-    })
+    }
     return data
 
 
@@ -300,10 +634,10 @@ async def view_consents(request: Request, chain_id: UUID4):
         "See [https://github.com/crim-ca/blockchain/blob/master/docs/consents.md] for more details."
     ),
     status_code=201,
-    response_model=schemas.UpdateConsentResponse,
     responses={
         201: {
-            "description": "Updated consents with new block in chain."
+            "description": "Updated consents with new block in chain.",
+            "model": schemas.UpdateConsentResponse,
         }
     },
     openapi_extra={
@@ -312,7 +646,7 @@ async def view_consents(request: Request, chain_id: UUID4):
             "required": True,
             "content": {
                 "application/json": {
-                    "schema": schemas.ConsentRequestBody.schema(ref_template="#/components/schemas/{model}"),
+                    "schema": CONSENT_REQUEST_SCHEMA,
                 },
                 # https://swagger.io/docs/specification/describing-request-body/multipart-requests/
                 "multipart/related": {
@@ -321,7 +655,7 @@ async def view_consents(request: Request, chain_id: UUID4):
                         "properties": {
                             "meta": {
                                 "description": "Metadata consents part.",
-                                "type": schemas.ConsentRequestBody.schema(ref_template="#/components/schemas/{model}")
+                                "type": CONSENT_REQUEST_SCHEMA
                             }
                         },
                         "additionalProperties": {
@@ -354,88 +688,55 @@ async def view_consents(request: Request, chain_id: UUID4):
 )
 async def update_consent(request: Request, chain_id: UUID4):  # , body: schemas.ConsentRequestBody
     try:
-        body = await request.json()
+        body = orjson.loads(await request.body())
     except (json.decoder.JSONDecodeError, TypeError, ValueError):
         body = await parse_multipart_consents(request)
     meta = schemas.ConsentRequestBody.validate(body)
 
-    # run the proof of work algorithm to get the next proof
     blockchain = get_chain(request.app, chain_id)
-    last_block = blockchain.last_block
-    proof = blockchain.proof_of_work(last_block)
-
-    # receive a reward for finding the proof.
-    # The sender is "0" to signify that this node has mined a new coin.
-    blockchain.new_consent(
+    consent = functools.partial(
+        blockchain.new_consent,
         action=meta.action,
         expire=meta.expire,
         consent=meta.consent,
         subsystems=meta.subsystems
     )
 
-    # Forge the new Block by adding it to the chain
-    previous_hash = blockchain.hash(last_block)
-    block = blockchain.new_block(proof, previous_hash)
-    request.app.db.save_chain(blockchain)
-
-    data = Base({
-        "message": "New block forged.",
-        "index": block["index"],
-        "transactions": block["transactions"],
-        "consents": block["consents"],
-        "proof": block["proof"],
-        "previous_hash": block["previous_hash"],
-    })
-    return data
+    # run the proof of work algorithm to get the next proof and forge the block with it
+    fields = ["index", "transactions", "consents", "proof", "previous_hash"]
+    return await run_in_threadpool(forge_block, request.app, blockchain, fields, consent)
 
 
 @CHAIN.get(
     "/{chain_id}/resolve",
     tags=["Chains", "Nodes"],
     summary="Resolve a blockchain with other registered nodes with consensus.",
-    response_model=schemas.ResolveChainResponse,
     responses={
         200: {
-            "description": "Resolved blockchain following consensus with other nodes."
+            "description": "Resolved blockchain following consensus with other nodes.",
+            "model": schemas.ResolveChainResponse,
         },
         201: {
-            "description": "Generated missing blockchain retrieved from other nodes."
+            "description": "Generated missing blockchain retrieved from other nodes.",
+            "model": schemas.ResolveChainResponse,
         }
     }
 )
-def consensus(request: Request, chain_id: UUID4):
-    blockchain = get_chain(request.app, chain_id, allow_missing=True)
-    generated = False
-    if not blockchain:
-        # special case of "first pull" of an entirely missing blockchain reference locally, but available elsewhere
-        # when node doesn't have any block yet (eg: just created node/chain), fetch full definition if possible
-        if not request.app.nodes:
-            raise HTTPException(404, f"Blockchain [{chain_id!s}] not found and cannot be resolved (no blockchain nodes available).")
-        for node in requset.app.nodes:
-            if check_blockchain_exists(node, chain_id):
-                # setup blockchain, but resolve conflicts with consensus instead of initialization
-                blockchain = Blockchain(id=chain_id, genesis_block=False)
-                generated = True
-                break
-        if blockchain is None:
-            raise HTTPException(404, f"Blockchain [{chain_id!s}] not found and cannot be resolved from other blockchain nodes.")
-
-    replaced, validated = blockchain.resolve_conflicts(request.app.nodes)
+async def consensus(request: Request, chain_id: UUID4):
+    blockchain, generated, replaced, validated = await resolve_chain(request.app, chain_id)
     if generated:
         message = "Missing blockchain was generated from remote node match."
-        request.app.blockchains[chain_id] = blockchain  # apply resolved generation
     elif replaced:
         message = "Blockchain was replaced with resolved conflicts."
     else:
         message = "Blockchain is authoritative."
-    data = Base({
+    data = {
         "message": message,
         "updated": blockchain.updated,
         "resolved": generated or replaced,
         "validated": bool(len(validated)),
         "nodes": [node.id for node in validated],
         "chain": blockchain.chain
-    })
+    }
     code = 201 if generated else 200
-    request.app.db.save_chain(blockchain)
-    return data, code
+    return json_response(data, status_code=code)
@@ -1,16 +1,18 @@
-import uuid
-from typing import TYPE_CHECKING
+import asyncio
+from typing import TYPE_CHECKING, Iterable, List
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Request, Response
 
 from blockchain.api import schemas
 from blockchain.impl import Node
-from blockchain.typedefs import AnyRef
-from blockchain.utils import get_links
+from blockchain.typedefs import AnyRef, IndexOrUUID
+from blockchain.utils import NODE_POOL, get_links, get_logger, json_dumps, json_response, parse_index_or_uuid
 
 if TYPE_CHECKING:
     from blockchain.app import BlockchainWebApp
 
+LOGGER = get_logger(__name__)
+
 NODES = APIRouter(prefix="/nodes")
 
 
@@ -24,41 +26,110 @@ def get_node(app: "BlockchainWebApp", node_ref: AnyRef) -> Node:
     :raises: block cannot be found or reference is invalid.
     :returns: matched block, also returns the chain it was found in if not provided as input.
     """
-    if str.isnumeric(node_ref):
-        node_idx = int(node_ref)
-        if node_idx < 0 or node_idx >= len(app.nodes):
-            raise HTTPException(400, f"Node reference as numeric index out of range [0, {len(app.nodes)}].")
-        return app.nodes[node_idx]
-    try:
-        node_ref = uuid.UUID(node_ref)
-    except (TypeError, ValueError):
-        raise HTTPException(400, f"Node reference not a valid UUID [{node_ref!s}]")
+    if isinstance(node_ref, str):
+        try:
+            node_ref = parse_index_or_uuid(node_ref)
+        except ValueError:
+            raise HTTPException(400, f"Node reference not a valid UUID or numeric index [{node_ref!s}]")
+    if isinstance(node_ref, int):
+        try:
+            if node_ref >= 0:  # negative indices would be valid for the list, but not as references
+                return app.nodes[node_ref]
+        except IndexError:
+            pass
+        raise HTTPException(400, f"Node reference as numeric index out of range [0, {len(app.nodes)}].")
+
+    node = app.nodes_by_id.get(node_ref)
+    if node is None or node.id != node_ref:
+        # index only contains nodes that had a resolved ID when registered or during a previous search
+        nodes_by_id = {}
+        for node in list(app.nodes):
+            node_id = node.id  # inline resolve as needed
+            if node_id is not None:
+                nodes_by_id[node_id] = node
+        app.nodes_by_id = nodes_by_id
+        node = nodes_by_id.get(node_ref)
+    if node is None:
+        raise HTTPException(404, f"Node reference UUID [{node_ref!s}] not found.")
+    return node
+
+
+def add_nodes(app: "BlockchainWebApp", nodes: Iterable[Node]) -> None:
+    """
+    Register nodes to the application, indexing them by URL and by ID when already resolved.
+
+    :raises HTTPException: if any of the nodes is already registered, in which case none of them is added.
+    """
+    nodes = list(nodes)
+    with app.nodes_lock:
+        # verified under the lock to avoid concurrent registrations of the same node
+        existing = app.nodes_by_url.keys() & {node.url for node in nodes}
+        if existing:
+            raise HTTPException(409, f"Node already registered: {sorted(existing)}")
+        for node in nodes:
+            app.nodes.append(node)
+            app.nodes_by_url[node.url] = node
+            if node["id"] is not None:  # avoid inline resolve
+                app.nodes_by_id[node["id"]] = node
+        app.nodes_version += 1
 
-    for node in app.nodes:
-        if node.id == node_ref:
-            return node
-    raise HTTPException(404, f"Node reference UUID [{node_ref!s}] not found.")
+
+def confirm_node_ids(app: "BlockchainWebApp", nodes: List[Node]) -> None:
+    """
+    Synchronize the IDs of nodes restored from the database with the ones currently reported by the remote nodes.
+
+    Restored IDs can be outdated since remote nodes generate a new ID on every startup unless one is provided.
+    Nodes that cannot be reached are left unresolved, as if their ID had been synchronized on registration.
+    """
+    remote_ids = list(NODE_POOL.map(Node.fetch_id, nodes))
+    changed = False
+    with app.nodes_lock:
+        for node, remote_id in zip(nodes, remote_ids):
+            if node["id"] == remote_id:
+                continue
+            LOGGER.info("Node [%s] ID updated from [%s] to [%s].", node.url, node["id"], remote_id)
+            app.nodes_by_id.pop(node["id"], None)
+            node._id = remote_id
+            if remote_id is not None:
+                app.nodes_by_id[remote_id] = node
+            changed = True
+        if changed:
+            app.nodes_version += 1
+    if changed and app.db is not None:
+        app.db.save_nodes(app.nodes)
 
 
 @NODES.get(
     "/",
     tags=["Nodes"],
     summary="Obtain other nodes known by this node for consensus resolution.",
-    response_model=schemas.NodesResponse,
     responses={
         200: {
-            "description": "Registered nodes which this blockchain node will resolve consensus against."
+            "description": "Registered nodes which this blockchain node will resolve consensus against.",
+            "model": schemas.NodesResponse,
         }
     }
 )
 async def list_nodes(request: Request, detail=False, sync=False):
-    links = get_links(request, NODES)
-    nodes = request.app.nodes or []
+    app = request.app  # type: BlockchainWebApp
+    nodes = list(app.nodes or [])
     if sync:
-        for node in nodes:
-            node.sync_id()
-    nodes = [node.json() if detail else node.url for node in nodes]
-    return {"nodes": nodes, "links": links}
+        # blocking requests to all nodes dispatched concurrently without holding the event loop
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*[loop.run_in_executor(NODE_POOL, node.sync_id) for node in nodes])
+        with app.nodes_lock:
+            app.nodes_version += 1  # resolved IDs could have changed
+        if app.db is not None:
+            await loop.run_in_executor(None, app.db.save_nodes, nodes)
+    key = (app.nodes_version, detail, str(request.base_url), request.url.path)
+    body = app.nodes_listings.get(key)
+    if body is None:
+        data = {
+            "nodes": [node.json() if detail else node.url for node in nodes],
+            "links": get_links(request, NODES),
+        }
+        body = app.nodes_listings[key] = json_dumps(data)
+    return Response(body, media_type="application/json")
 
 
 @NODES.post(
@@ -66,40 +137,44 @@ async def list_nodes(request: Request, detail=False, sync=False):
     tags=["Nodes"],
     summary="Register a new blockchain node to resolve consensus against.",
     status_code=201,
-    response_model=schemas.RegisterNodesResponse,
     responses={
         201: {
-            "description": "Description of the registered node."
+            "description": "Description of the registered node.",
+            "model": schemas.RegisterNodesResponse,
         }
     }
 )
 def register_nodes(request: Request, body: schemas.RegisterNodesBody):
     app = request.app
-    endpoints = body.get("nodes")
-    if endpoints is None:
-        return "Error: Please supply a valid list of nodes", 400
-
-    node_urls = [node.url for node in app.nodes]
-    for node_endpoint in endpoints:
-        try:
-            node = Node(node_endpoint)
-        except Exception as exc:
-            raise HTTPException(400, str(exc))
-        if node_endpoint in node_urls:
-            raise HTTPException(409, f"Node already registered: [{node_endpoint}]")
-        app.nodes.append(node)  # noqa
-        for chain in app.blockchains.values():
-            chain.register_node(node)
+    # body already parsed and validated against the schema by FastAPI, with at least one node URL
+    try:
+        # same URL as the nodes would employ, with repeated endpoints removed while preserving their order
+        node_urls = list(dict.fromkeys(Node.normalize_url(str(url)) for url in body.nodes))
+    except ValueError as exc:
+        raise HTTPException(400, str(exc))
+    # early verification to avoid resolving the IDs of new nodes needlessly, confirmed again when adding them
+    existing = app.nodes_by_url.keys() & set(node_urls)
+    if existing:
+        raise HTTPException(409, f"Node already registered: {sorted(existing)}")
+
+    # only create nodes once all endpoints are known to be new, since their creation resolves their remote ID
+    try:
+        new_nodes = [Node(node_url) for node_url in node_urls]
+    except Exception as exc:
+        raise HTTPException(400, str(exc))
+    add_nodes(app, new_nodes)
+    for chain in app.blockchains.values():
+        chain.register_nodes(new_nodes)
 
     data = {
         "message": "New nodes have been added.",
         "total": len(app.nodes),
     }
-    return data
+    return json_response(data, status_code=201)
 
 
 @NODES.get(
-    "/{node_ref}",
+    "/{node_ref:anyref}",
     tags=["Nodes"],
     summary="Obtain synchronization details of a registered blockchain node.",
     responses={
@@ -108,6 +183,6 @@ def register_nodes(request: Request, body: schemas.RegisterNodesBody):
         }
     }
 )
-async def view_node(request: Request, node_ref: AnyRef):
+async def view_node(request: Request, node_ref: IndexOrUUID):
     node = get_node(request.app, node_ref)
-    return node
+    return json_response(node.json())
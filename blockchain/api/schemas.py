@@ -9,7 +9,7 @@ from blockchain.impl import ChangeHistoryStatus, ConsentAction, ConsentType, Dat
 from blockchain.typedefs import Mapping
 
 
-VersionString = constr(regex="^[0-9]+.[0-9]+.[0-9]+$")
+VersionString = constr(regex=r"^[0-9]+\.[0-9]+\.[0-9]+$")
 
 
 def BlockPathRef(*args, description="Block UUID or index in the chain.", **kwargs):  # noqa
@@ -4,22 +4,28 @@ import argparse
 import uuid
 import logging
 import sys
-from typing import Any, Dict, List, Optional, Union
+import threading
+from typing import Any, Dict, List, Optional, Tuple, Type, Union
 from urllib.parse import urlparse
 
-from fastapi import FastAPI, HTTPException, Request
+import httpx
+from cachetools import LRUCache
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.staticfiles import StaticFiles
+from starlette.exceptions import HTTPException as StarletteHTTPException
 from pydantic.errors import PydanticTypeError
 from pydantic.validators import bool_validator, int_validator, float_validator
 from uvicorn.config import Config
 from uvicorn.server import Server
 
 from blockchain import __meta__, __title__
-from blockchain.api import BLOCK, CHAIN, MAIN, MAKO, NODES, VIEWS, schemas
+from blockchain.api import BLOCK, CHAIN, MAIN, MAKO, NODES, VIEWS, get_openapi_contents, schemas
+from blockchain.api.chain import ChainListMiddleware
+from blockchain.api.nodes import add_nodes, confirm_node_ids
 from blockchain.database import DB_TYPES, Database
 from blockchain.impl import Blockchain, MultiChain, Node
 from blockchain.typedefs import AnyUUID
-from blockchain.utils import get_logger, set_logger_config, update_uvicorn_logger_config
+from blockchain.utils import JSONResponse, get_logger, json_dumps, set_logger_config, update_uvicorn_logger_config
 
 LOGGER = get_logger("blockchain")
 
@@ -27,52 +33,137 @@ LOGGER = get_logger("blockchain")
 class BlockchainWebApp(FastAPI):
     blockchains: MultiChain = None
     nodes: List[Node] = None  # list instead of set to preserve order
+    nodes_by_id: Dict[uuid.UUID, Node] = None  # only nodes with resolved ID
+    nodes_by_url: Dict[str, Node] = None
+    nodes_lock: threading.Lock = None
+    nodes_version: int = 0  # incremented whenever registered nodes or their details are modified
+    # serialized listings of nodes, the version of registered nodes identifies the state they represent
+    nodes_listings: "LRUCache[Tuple[int, bool, str, str], bytes]" = None
     node: Node = None
     db: Database = None
     secret: str = None
+    openapi_contents: Dict[str, bytes] = None  # pre-rendered OpenAPI schema by output format
+    http: httpx.AsyncClient = None  # persistent connections to remote nodes
+    scope_routes: Dict[str, List[Tuple[str, str]]] = None  # static routes by prefix, collected for links on first use
+    # generated route links, which only vary according to the base URL the application is served from
+    links: "LRUCache[Tuple[str, str, str, bool], List[Dict[str, str]]]" = None
+    chain_links: "LRUCache[Tuple[str, str], List[Dict[str, str]]]" = None
+    # serialized chain summaries per base URL (for links), entity tags identify the state of the chain they represent
+    chain_views: "LRUCache[Tuple[uuid.UUID, str, str], bytes]" = None
+    chain_blocks: "LRUCache[Tuple[uuid.UUID, str], bytes]" = None
+    # serialized listings of local blockchains, identified by the version of the mapping of blockchains they represent
+    chains_listings: "LRUCache[int, bytes]" = None
+
+
+async def handle_http_exception(request: Request, exc: StarletteHTTPException) -> Response:
+    """
+    Render HTTP errors with the same body as the default handler, but directly serialized to bytes by :mod:`orjson`.
+    """
+    headers = getattr(exc, "headers", None)
+    if exc.status_code in [204, 304]:
+        return Response(status_code=exc.status_code, headers=headers)
+    body = json_dumps({"detail": exc.detail})
+    return Response(body, status_code=exc.status_code, headers=headers, media_type="application/json")
+
+
+def create_app() -> BlockchainWebApp:
+    """
+    Instantiate the blockchain node web application with all its routers.
+
+    The OpenAPI schema is rendered on application startup, once all routes are defined, rather than on first request.
+    """
+    app = BlockchainWebApp(
+        title=__title__,
+        description=__meta__["Summary"],
+        version=__meta__["Version"],
+        contact={
+            "name": __meta__["Maintainer"],
+            "email": __meta__["Maintainer-email"],
+            "url": __meta__["Home-page"],
+        },
+        license_info={
+            "name": __meta__["License"],
+        },
+        docs_url="/api",
+        openapi_url="/json",
+        default_response_class=JSONResponse,
+        openapi_tags=[
+            {"name": "API", "description": "General metadata and information about the API."},
+            {"name": "Blocks", "description": "Operations related to blocks that compose the chains."},
+            {"name": "Chains", "description": "Operations related to blockchains that hold user-data consents."},
+            {"name": "Consents", "description": "Management of user consents over owned data."},
+            {"name": "Nodes", "description": "Management of distinct nodes for consensus resolution of blockchains."},
+            {"name": "UI", "description": "Visualization endpoints of the data represented in blockchains."},
+        ]
+    )
+    app.openapi_version = "3.0.3"
+    app.nodes = []
+    app.nodes_by_id = {}
+    app.nodes_by_url = {}
+    app.nodes_lock = threading.Lock()
+    app.nodes_listings = LRUCache(maxsize=64)
+    app.links = LRUCache(maxsize=4096)
+    app.chain_links = LRUCache(maxsize=4096)
+    app.chain_views = LRUCache(maxsize=1024)
+    app.chain_blocks = LRUCache(maxsize=1024)
+    app.chains_listings = LRUCache(maxsize=16)
+
+    @app.on_event("startup")
+    async def open_http_client() -> None:
+        # created within the running event loop that will employ it
+        app.http = httpx.AsyncClient(
+            http2=True,
+            timeout=2.0,
+            follow_redirects=True,
+            limits=httpx.Limits(max_keepalive_connections=64),
+        )
+
+    @app.on_event("shutdown")
+    async def close_http_client() -> None:
+        await app.http.aclose()
+
+    @app.on_event("startup")
+    def render_openapi() -> None:
+        # schema cannot change once routes are defined, render it before the first request needs it
+        for out_format in ("json", "yaml"):
+            get_openapi_contents(app, out_format)
+
+    @app.on_event("shutdown")
+    def save_pending_chains() -> None:
+        if app.db is not None:
+            app.db.flush()
+    app.add_exception_handler(StarletteHTTPException, handle_http_exception)
+    app.add_middleware(ChainListMiddleware)
+    app.include_router(BLOCK)
+    app.include_router(CHAIN)
+    app.include_router(MAIN)
+    app.include_router(NODES)
+    app.include_router(VIEWS)
+    # serve static files via APP instead of VIEWS, router does not seem to work
+    app.mount("/static", StaticFiles(directory=os.path.join(os.path.dirname(__file__), "ui/static")))
+    app.__name__ = __title__
+    lookup = MAKO.init_app(app, pkg_path=os.path.dirname(__file__))
+    # compile all templates (pages and their inherited/included parts) immediately instead of on first page requests
+    # pages themselves cannot be pre-rendered since they depend on the node, chains and request location
+    for template in os.listdir(os.path.join(os.path.dirname(__file__), "ui/templates")):
+        if template.endswith(".mako"):
+            lookup.get_template(f"ui/templates/{template}")
+    return app
 
 
 # Instantiate the blockchain node webapp
-APP = BlockchainWebApp(
-    title=__title__,
-    description=__meta__["Summary"],
-    version=__meta__["Version"],
-    contact={
-        "name": __meta__["Maintainer"],
-        "email": __meta__["Maintainer-email"],
-        "url": __meta__["Home-page"],
-    },
-    license_info={
-        "name": __meta__["License"],
-    },
-    docs_url="/api",
-    openapi_url="/json",
-    openapi_tags=[
-        {"name": "API", "description": "General metadata and information about the API."},
-        {"name": "Blocks", "description": "Operations related to blocks that compose the chains."},
-        {"name": "Chains", "description": "Operations related to blockchains that hold user-data consents."},
-        {"name": "Consents", "description": "Management of user consents over owned data."},
-        {"name": "Nodes", "description": "Management of distinct nodes for consensus resolution of blockchains."},
-        {"name": "UI", "description": "Visualization endpoints of the data represented in blockchains."},
-    ]
-)
-APP.openapi_version = "3.0.3"
-APP.include_router(BLOCK)
-APP.include_router(CHAIN)
-APP.include_router(MAIN)
-APP.include_router(NODES)
-APP.include_router(VIEWS)
-# serve static files via APP instead of VIEWS, router does not seem to work
-APP.mount("/static", StaticFiles(directory=os.path.join(os.path.dirname(__file__), "ui/static")))
-APP.__name__ = __title__
-MAKO.init_app(APP, pkg_path=os.path.dirname(__file__))
+APP = create_app()
 
 
 class DatabaseTypeAction(argparse.Action):
     choices = list(DB_TYPES)
 
-    @classmethod
-    def get_db(cls, value):
+    @staticmethod
+    def parse_db(value):
+        # type: (str) -> Tuple[Type[Database], str]
+        """
+        Resolve the database implementation and connection reference from its URI.
+        """
         if not isinstance(value, str):
             raise TypeError("Invalid database URI string")
         uri = urlparse(value)
@@ -87,6 +178,12 @@ class DatabaseTypeAction(argparse.Action):
         db_impl = DB_TYPES.get(db_type)
         if not db_impl:
             raise ValueError(f"Unknown database type: [{db_type!s}]")
+        return db_impl, db_conn
+
+    @classmethod
+    def get_db(cls, value):
+        # new instance each time since databases hold the state of their pending saves
+        db_impl, db_conn = cls.parse_db(value)
         return db_impl(db_conn)
 
     def __call__(self, parser, namespace, values, option_string=None):
@@ -121,7 +218,11 @@ def parse_xargs(args: List[str], logger: logging.Logger) -> Dict[str, Union[str,
     return xargs
 
 
-def main(**args):
+def get_parser():
+    # type: () -> argparse.ArgumentParser
+    """
+    Command line parser of the application.
+    """
     parser = argparse.ArgumentParser(prog="blockchain", description="Blockchain Node Web Application")
     parser.add_argument("-p", "--port", default=5000, type=int, help="Port to listen on.")
     parser.add_argument("-H", "--host", default="0.0.0.0", help="Host to employ (can include protocol scheme).")
@@ -147,7 +248,11 @@ def main(**args):
                             help="Debug level logging. This also enables error traceback outputs in responses.")
     log_args.add_argument("-v", "--verbose", action="store_true", help="Enforce verbose logging to stdout.")
     log_args.add_argument("-l", "--log", help="output file to write generated logs.")
+    return parser
 
+
+def main(**args):
+    parser = get_parser()
     ns, argv = parser.parse_known_args(args=args or None)
 
     # set full module config
@@ -200,11 +305,20 @@ def run(host="0.0.0.0",         # type: str
         if nodes:
             if isinstance(nodes, str):
                 nodes = [nodes.split(",") if "," in nodes else nodes.split(" ") if " " in nodes else [nodes]]
-            nodes = {node for node_list in nodes for node in node_list}  # flatten repeated -N, multi-URI per -N
-            APP.nodes = list(sorted([Node(node) for node in nodes], key=lambda n: n.url))
-            for node_ref in APP.nodes:
-                if urlparse(node_ref.url) == urlparse(APP.node.url):
-                    raise ValueError("Cannot use current APP endpoint as other consensus node endpoint.")
+            # flatten repeated -N, multi-URI per -N, with endpoints written differently for a same node combined
+            nodes = {Node.normalize_url(node) for node_list in nodes for node in node_list}
+            # reuse node IDs resolved on previous startups to avoid a blocking request to each node
+            node_ids = APP.db.load_nodes()
+            nodes = [Node(node, id=node_ids.get(node)) for node in nodes]
+            add_nodes(APP, sorted(nodes, key=lambda n: n.url))
+            if APP.node.parsed_url in {node_ref.parsed_url for node_ref in APP.nodes}:
+                raise ValueError("Cannot use current APP endpoint as other consensus node endpoint.")
+            APP.db.save_nodes(APP.nodes)
+            # restored IDs are only used until confirmed against the remote nodes, which could have restarted
+            restored = [node_ref for node_ref in APP.nodes if node_ref.url in node_ids]
+            if restored:
+                threading.Thread(target=confirm_node_ids, args=(APP, restored),
+                                 name="blockchain-nodes-confirm", daemon=True).start()
         if app:
             # propagate logging config
             config = update_uvicorn_logger_config(logger)
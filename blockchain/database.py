@@ -1,20 +1,80 @@
 import abc
-import json
 import os
+import threading
 import uuid
 from typing import TYPE_CHECKING
 
-from blockchain.impl import Block, Blockchain, MultiChain
+import orjson
+
+from blockchain.impl import Block, Blockchain, MultiChain, Node
 from blockchain.typedefs import AnyUUID
-from blockchain.utils import get_logger, is_uuid
+from blockchain.utils import get_logger, is_uuid, json_dumps
 
 if TYPE_CHECKING:
-    from typing import Optional, Tuple
+    from typing import Dict, Iterable, Optional, Set, Tuple
 
 LOGGER = get_logger(__name__)
 
 
 class Database(abc.ABC):
+    def __init__(self, *_, **__):
+        self._pending = {}  # type: Dict[uuid.UUID, Blockchain]
+        self._pending_lock = threading.Lock()
+        self._pending_event = threading.Event()
+        self._write_lock = threading.Lock()
+        self._writer = None  # type: Optional[threading.Thread]
+
+    def enqueue_save(self, chain):
+        # type: (Blockchain) -> None
+        """
+        Schedules the blockchain to be saved by the background writer instead of within the calling request.
+
+        Any save still pending for the same blockchain is replaced, such that successive updates are written once.
+        """
+        with self._pending_lock:
+            self._pending[chain.id] = chain
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._write_pending, name="blockchain-db-writer", daemon=True)
+                self._writer.start()
+            self._pending_event.set()
+
+    def _write_pending(self):
+        # type: () -> None
+        while True:
+            self._pending_event.wait()
+            self.flush()
+
+    def flush(self):
+        # type: () -> None
+        """
+        Saves immediately all blockchains with pending changes.
+        """
+        # pending chains are taken under the write lock such that a flush also waits for saves already in progress
+        with self._write_lock:
+            with self._pending_lock:
+                pending, self._pending = self._pending, {}
+                self._pending_event.clear()
+            for chain in pending.values():
+                try:
+                    self.save_chain(chain)
+                except Exception as exc:  # noqa
+                    LOGGER.error("Failed saving blockchain [%s].", chain.id, exc_info=exc)
+
+    def load_nodes(self):
+        # type: () -> Dict[str, str]
+        """
+        Loads the previously resolved IDs of consensus nodes, by node URL.
+
+        Databases that do not store them report none, in which case node IDs are resolved from the remote nodes.
+        """
+        return {}
+
+    def save_nodes(self, nodes):
+        # type: (Iterable[Node]) -> None
+        """
+        Saves the resolved IDs of consensus nodes, such that they can be reused on following startups.
+        """
+
     @abc.abstractmethod
     def load_multi_chain(self):
         # type: () -> MultiChain
@@ -53,6 +113,7 @@ class FileSystemDatabase(Database):
         self.txt = ""
         self.path = ""
         self.multi = False
+        self._saved_blocks = {}  # type: Dict[uuid.UUID, Set[uuid.UUID]]
         path = path.split("://")[-1]
         if os.path.isfile(path) and path.endswith(".json"):
             self.path = path
@@ -83,6 +144,34 @@ class FileSystemDatabase(Database):
             chain_path = os.path.join(store_path, "chain.json")
         return store_path, chain_path
 
+    def get_nodes_location(self):
+        # type: () -> str
+        store_path, _ = self.get_chain_location(None)
+        return os.path.join(store_path, "nodes.json")
+
+    def load_nodes(self):
+        # type: () -> Dict[str, str]
+        """
+        Loads the resolved IDs of consensus nodes from file system.
+        """
+        nodes_path = self.get_nodes_location()
+        if not os.path.isfile(nodes_path):
+            return {}
+        with open(nodes_path, "rb") as nodes_file:
+            return orjson.loads(nodes_file.read())
+
+    def save_nodes(self, nodes):
+        # type: (Iterable[Node]) -> None
+        """
+        Saves the resolved IDs of consensus nodes to file system.
+        """
+        # unresolved nodes are omitted to retry their resolution on next startup
+        node_ids = {node.url: str(node["id"]) for node in nodes if node["id"] is not None}
+        store_path, _ = self.get_chain_location(None)
+        os.makedirs(store_path, exist_ok=True)
+        with open(self.get_nodes_location(), "wb") as nodes_file:
+            nodes_file.write(json_dumps(node_ids))
+
     def load_multi_chain(self):
         # type: () -> MultiChain
         """
@@ -103,8 +192,8 @@ class FileSystemDatabase(Database):
             LOGGER.warning("No such chain: [%s]", chain_path)
             return MultiChain()
         else:
-            with open(chain_path) as chain_file:
-                data = json.load(chain_file)
+            with open(chain_path, "rb") as chain_file:
+                data = orjson.loads(chain_file.read())
         chains = MultiChain()
         if "chains" in data:
             self.multi = True
@@ -130,13 +219,14 @@ class FileSystemDatabase(Database):
         if not os.path.isfile(chain_path):
             LOGGER.warning("No such chain: [%s]", chain_path)
         else:
-            with open(chain_path) as chain_file:
-                blockchain = json.load(chain_file)
+            with open(chain_path, "rb") as chain_file:
+                blockchain = orjson.loads(chain_file.read())
             chain_id = uuid.UUID(blockchain["id"])
             LOGGER.info("%s blocks in chain [%s]", len(blockchain["blocks"]), chain_path)
             for block_id in blockchain["blocks"]:
                 block = self.load_block(block_id, chain_id)
                 blocks.append(block)
+            self._saved_blocks[chain_id] = {block.id for block in blocks}
         return Blockchain(chain=blocks, id=chain_id)
 
     def load_block(self, block_id, chain_id=None):
@@ -146,8 +236,8 @@ class FileSystemDatabase(Database):
         """
         store_path, _ = self.get_chain_location(chain_id)
         block_path = os.path.join(store_path, f"{block_id!s}.json")
-        with open(block_path) as block_file:
-            block = json.load(block_file)
+        with open(block_path, "rb") as block_file:
+            block = orjson.loads(block_file.read())
         return Block(**block)
 
     def save_multi_chain(self, multi_chain):
@@ -170,14 +260,23 @@ class FileSystemDatabase(Database):
         """
         store_path, chain_path = self.get_chain_location(chain.id)
         os.makedirs(store_path, exist_ok=True)
+        # blocks and chain definition are obtained at once since requests can add blocks while saving
+        with chain.lock:
+            blocks = list(chain.blocks)
+            chain_json = chain.json()
         # save blocks (as needed) first to avoid updating chain with missing
         # block if one block has corrupted data causing it to fail save
-        for block in chain.blocks:
+        # blocks already known to be stored are skipped without looking up their file
+        saved_blocks = self._saved_blocks.setdefault(chain.id, set())
+        for block in blocks:
+            if block.id in saved_blocks:
+                continue
             LOGGER.debug("Saving block %s (if missing)...", block.id)
             self.save_block(block, chain_id=chain.id)
-        with open(chain_path, "w") as chain_file:
+            saved_blocks.add(block.id)
+        with open(chain_path, "wb") as chain_file:
             LOGGER.debug("Saving updated blockchain %s definition with new block(s)...", chain.id)
-            json.dump(chain.json(), chain_file)
+            chain_file.write(json_dumps(chain_json))
 
     def save_block(self, block, chain_id=None):
         # type: (Block, Optional[AnyUUID]) -> None
@@ -188,8 +287,8 @@ class FileSystemDatabase(Database):
         block_path = os.path.join(store_path, f"{block.id!s}.json")
         if os.path.isfile(block_path):
             return
-        with open(block_path, "w") as block_file:
-            json.dump(block.json(), block_file)
+        with open(block_path, "wb") as block_file:
+            block_file.write(json_dumps(block))  # cached JSON representation of the block
 
 
 # known implementations
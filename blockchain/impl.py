@@ -1,23 +1,33 @@
 import abc
 import hashlib
+import hmac
+import itertools
 import json
+import threading
 import uuid
+from concurrent.futures import as_completed
 from datetime import datetime
 from decimal import Decimal
 from enum import Enum, auto
-from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Tuple, Union
-from urllib.parse import urlparse
+from functools import cached_property
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+from urllib.parse import ParseResult, urlparse
 
 import magic
+import orjson
 import requests
 from dateutil import parser as dt_parser
 from addict import Dict as AttributeDict  # auto generates attribute, properties and getter/setter dynamically
 
 from blockchain.typedefs import AnyUUID, JSON, Mapping
-from blockchain.utils import compute_hash, get_logger
+from blockchain.utils import NODE_POOL, NODE_SESSION, compute_hash, get_hash_secret, get_logger
 
 LOGGER = get_logger(__name__)
 
+# same output as 'json.dumps(..., sort_keys=True)', but without creating a new encoder for each block hash
+# must remain the stdlib encoder to preserve the exact hashed representation for compatibility across nodes
+HASH_JSON_ENCODER = json.JSONEncoder(sort_keys=True)
+
 # https://www.iana.org/assignments/media-types/media-types.xhtml
 KNOWN_MEDIA_TYPES = frozenset([
     "application",
@@ -526,7 +536,13 @@ class ConsentChange(WithDatetimeCreated):
         Compute the latest consents resolution cumulated over the whole blockchain history.
 
         If any known action does not provide any corresponding consent, it is defaulted to not consented.
+        Resolution is done under the :attr:`Blockchain.consents_lock` since it updates the states of the chain.
         """
+        with chain.consents_lock:
+            return cls._latest(chain)
+
+    @classmethod
+    def _latest(cls, chain: "Blockchain") -> List[Consent]:
         chain.setdefault("states", {})
         last_id = chain.states.consent_change_last_id
         if not last_id or chain.last_block.id != last_id:
@@ -534,18 +550,33 @@ class ConsentChange(WithDatetimeCreated):
         consents = chain.states.consent_change_updated
         undefined = [Consent(action, False) for action in ConsentAction if action not in consents]
         resolved = list(sorted(list(consents.values()) + undefined, key=lambda c: c.action.value))
+        now = datetime.utcnow()
+        expired = set()
         for consent in resolved:
-            if consent.expire and datetime.utcnow() > consent.expire:
+            # expiry is applied only once, consents already marked are not modified anymore
+            if consent.expire and consent.type != ConsentType.EXPIRED and now > consent.expire:
                 consent.type = ConsentType.EXPIRED
                 consent.consent = False
+                expired.add(id(consent))
+        if expired:
+            # consents are shared with the blocks that defined them, only those blocks have outdated representations
+            for block in chain.blocks:
+                if any(id(consent) in expired for consent in block.consents):
+                    block.clear_cache()
         return resolved
 
     @classmethod
     def history(cls, chain: "Blockchain") -> Tuple[List[str], List[ChangeHistoryItem]]:
         """
         Compute the change history of consents across a blockchain.
+
+        Resolution is done under the :attr:`Blockchain.consents_lock` since it updates the states of the chain.
         """
+        with chain.consents_lock:
+            return cls._history(chain)
 
+    @classmethod
+    def _history(cls, chain: "Blockchain") -> Tuple[List[str], List[ChangeHistoryItem]]:
         # speed up skipping pre-computed without changes
         summary = chain.states.consent_change_summary  # type: List[str]
         changes = chain.states.consent_change_history  # type: List[ChangeHistoryItem]
@@ -597,6 +628,7 @@ class ConsentChange(WithDatetimeCreated):
                         detail = "block without consents change"
                         summary.append(f"[{status}] => {detail}")
                         changes.append(ChangeHistoryItem(status=status, detail=detail))
+            block.clear_cache()  # consent types updated
             prev_block = block
 
         chain.states.unfreeze()
@@ -632,6 +664,7 @@ class Node(WithID):
         if _id is not None and not isinstance(_id, uuid.UUID):
             raise TypeError(f"Invalid UUID: {_id!s}")
         dict.__setitem__(self, "_id", _id)
+        self.__dict__.pop("_json", None)  # details must reflect the new ID
 
     @property
     def id(self):
@@ -648,11 +681,28 @@ class Node(WithID):
     def resolved(self):
         return self.id is not None  # attempts inline resolve
 
+    @cached_property
+    def parsed_url(self) -> ParseResult:
+        return urlparse(self.url)
+
     def json(self, **__):
-        _id = self.id  # inline resolve as needed if it becomes available
-        return {"id": _id, "url": self.url, "resolved": _id is not None}
+        """
+        Details of the node, generated again only when its ID is resolved or reset.
+        """
+        data = self.__dict__.get("_json")
+        if data is None:
+            _id = self.id  # inline resolve as needed if it becomes available
+            data = {"id": _id, "url": self.url, "resolved": _id is not None}
+            dict.__setattr__(self, "_json", data)
+        return data
 
-    def _fix_url(self, endpoint):
+    @staticmethod
+    def normalize_url(endpoint: str) -> str:
+        """
+        Obtain the URL that a node registered with the endpoint would employ.
+
+        :raises ValueError: if the endpoint is not a valid node location.
+        """
         parsed_url = urlparse(endpoint)
         if parsed_url.netloc:
             url = parsed_url.netloc
@@ -663,21 +713,32 @@ class Node(WithID):
             raise ValueError(f"Invalid node location: [{endpoint}]")
         if not url.startswith("http"):
             url = f"http://{url}"
-        self["url"] = url
+        return url
+
+    def _fix_url(self, endpoint):
+        self["url"] = self.normalize_url(endpoint)
 
     def sync_id(self):
         self._id = None  # reset (from Base)
+        self._id = self.fetch_id()
+
+    def fetch_id(self) -> Optional[uuid.UUID]:
+        """
+        Request the ID currently reported by the remote node, without modifying the one of this node reference.
+        """
         try:
-            resp = requests.get(self.url, timeout=2)
+            resp = NODE_SESSION.get(self.url, timeout=2)
             if resp.status_code == 200:
-                self._id = resp.json()["node"]
-                return
+                return uuid.UUID(str(resp.json()["node"]))
         except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
             pass
+        except (ValueError, KeyError, TypeError):  # not a node response (invalid JSON, missing or malformed ID)
+            pass
         LOGGER.warning("Node ID not yet resolved for location: [%s]", self.url)
+        return None
 
 
-class Block(ConsentChange):
+class Block(ConsentChange, WithID):
     """
     Block used to form the chain.
     """
@@ -698,6 +759,19 @@ class Block(ConsentChange):
                 kwargs.update(items)
         super(Block, self).__init__(**kwargs)
 
+    @cached_property
+    def as_json(self) -> JSON:
+        """
+        JSON representation of the block computed only once.
+
+        Blocks are not expected to be modified once forged in the chain.
+        Any operation that updates their contents must call :meth:`clear_cache` to regenerate it.
+        """
+        return self.json()
+
+    def clear_cache(self) -> None:
+        self.__dict__.pop("as_json", None)
+
     @property
     def hash(self):
         # type: () -> str
@@ -706,7 +780,7 @@ class Block(ConsentChange):
         """
         # ensure that the Dictionary is Ordered, or hashes will become inconsistent
         # hash must combine JSON representation such that other nodes can compute it as well
-        block_str = json.dumps(self.json(), sort_keys=True).encode()
+        block_str = HASH_JSON_ENCODER.encode(self.as_json).encode()
         block_hash = compute_hash(block_str)
         return block_hash
 
@@ -735,7 +809,6 @@ class Blockchain(WithID):
         self.difficulty = difficulty
         self.pending_transactions = []
         self.pending_consents = []
-        LOGGER.warning("CHAIN: %s", chain)
         self["blocks"] = [
             block if isinstance(block, Block) else Block(**block)
             for block in chain or []
@@ -748,6 +821,9 @@ class Blockchain(WithID):
             "consent_change_last_id": None,     # type: Optional[uuid.UUID]
         }))
         self.states.freeze()  # only history computation can modify with explicit unfreeze
+        dict.__setattr__(self, "_nodes", set())
+        dict.__setattr__(self, "_lock", threading.RLock())
+        dict.__setattr__(self, "_consents_lock", threading.RLock())
 
         # Create the genesis block
         if not self.blocks and genesis_block:
@@ -773,9 +849,20 @@ class Blockchain(WithID):
         return {
             "id": str(self.id),
             "updated": self.updated,
-            "blocks": [block.json() if detail else str(block.id) for block in self.blocks]
+            "blocks": [block.json() for block in self.blocks] if detail else [str(_id) for _id in self.block_ids]
         }
 
+    def summary(self) -> JSON:
+        """
+        Summary JSON representation of the chain, regenerated only when it was modified since last call.
+        """
+        key = (self.updated, len(self.blocks))
+        cached = self.__dict__.get("_summary")
+        if cached is None or cached[0] != key:
+            cached = (key, self.json(detail=False))
+            dict.__setattr__(self, "_summary", cached)
+        return cached[1]
+
     def data(self,
              *_: Any,
              detail: bool = False,
@@ -784,18 +871,100 @@ class Blockchain(WithID):
         return {
             "id": self.id,
             "updated": self.updated,
-            "blocks": self.blocks if detail else [block.id for block in self.blocks]
+            "blocks": self.blocks if detail else list(self.block_ids)
         }
 
     @property
     def blocks(self) -> List[Block]:
         return dict.__getitem__(self, "blocks")
 
+    @property
+    def nodes(self) -> Set[str]:
+        """
+        Network locations of nodes registered for consensus resolution of this blockchain.
+        """
+        return self._nodes
+
+    @property
+    def lock(self) -> threading.RLock:
+        """
+        Lock to hold while modifying the blocks or pending changes of the chain from concurrent requests.
+
+        The lock is reentrant such that changes staged under it can be mined by :meth:`mine_block` directly.
+        """
+        return self._lock
+
+    @property
+    def consents_lock(self) -> threading.RLock:
+        """
+        Lock to hold while resolving or reading the consents states of the chain from concurrent requests.
+
+        Distinct from :attr:`lock` such that consents can be resolved while a new block is being mined.
+        """
+        return self._consents_lock
+
+    def register_node(self, node: Union[Node, str]) -> None:
+        """
+        Register a node for consensus resolution of this blockchain.
+
+        :param node: Node or its address (e.g.: ``http://192.168.0.5:5000``).
+        """
+        self.register_nodes([node])
+
+    def register_nodes(self, nodes: Iterable[Union[Node, str]]) -> None:
+        """
+        Register multiple nodes for consensus resolution of this blockchain at once.
+
+        The address of :class:`Node` instances is parsed only once across all blockchains they are registered to.
+
+        :param nodes: Nodes or their addresses (e.g.: ``http://192.168.0.5:5000``).
+        """
+        for node in nodes:
+            parsed_url = node.parsed_url if isinstance(node, Node) else urlparse(node)
+            # accepts an URL without scheme like "192.168.0.5:5000"
+            location = parsed_url.netloc or parsed_url.path
+            if location:
+                self._nodes.add(location)
+
     @blocks.setter
     def blocks(self, chain):
         dict.__setitem__(self, "blocks", [Block(block) for block in chain])
+        self._index_blocks()
         self._set_updated()
 
+    def _index_blocks(self) -> None:
+        """
+        Generate the ordered block IDs and their mapping to positions in the chain for quick lookup.
+        """
+        block_ids = [block.id for block in self.blocks]
+        dict.__setattr__(self, "_block_ids", block_ids)
+        dict.__setattr__(self, "_block_positions", {block_id: index for index, block_id in enumerate(block_ids)})
+
+    @property
+    def block_ids(self) -> List[uuid.UUID]:
+        """
+        Ordered IDs of blocks in the chain.
+
+        .. note::
+            The list is maintained internally, it must not be modified.
+        """
+        return self._block_ids
+
+    def block_position(self, block_id: uuid.UUID) -> Optional[int]:
+        """
+        Obtain the position of a block in the chain, or ``None`` if it is not part of it.
+        """
+        return self._block_positions.get(block_id)
+
+    def find_block(self, block_id: uuid.UUID) -> Optional[Block]:
+        """
+        Obtain the block matching the ID if it is part of the chain.
+        """
+        position = self._block_positions.get(block_id)
+        if position is None:
+            return None
+        return self.blocks[position]
+
     chain = blocks  # alias
 
     def valid_chain(self, chain: "Blockchain") -> bool:
@@ -840,41 +1009,63 @@ class Blockchain(WithID):
                 - List of all nodes that were available and consensus validation could be processed against
         """
 
-        new_chain = None
+        candidates = []  # type: List[Tuple[int, List[JSON]]]
         validated = []
 
         # We're only looking for chains longer than ours
         max_length = len(self.blocks)
 
         # Grab and verify the chains from all the nodes in our network
-        for node in nodes:
-            try:
-                response = requests.get(f"{node.url}/chains/{self.id!s}/blocks?detail=true", timeout=2)
-            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
-                LOGGER.warning("Node [%s] is unresponsive for conflict resolution. Skipping it.", node.url)
+        # requests are dispatched concurrently, but results are processed in the order of the nodes
+        nodes = list(nodes)
+        for node, body in zip(nodes, NODE_POOL.map(self._get_conflict_blocks, nodes)):
+            if body is None:
                 continue
-
-            if response.status_code != 200:
-                LOGGER.warning("Node [%s] responded with invalid code [%s] during conflict resolution. "
-                               "Skipping it.", node, response.status_code)
-                continue
-
             validated.append(node)
-            body = response.json()
             length = body["length"]
-            chain = Blockchain(chain=body["blocks"], id=self.id)
+            if length > max_length:
+                candidates.append((length, body["blocks"]))
 
-            # Check if the length is longer and the chain is valid
-            if length > max_length and self.valid_chain(chain):
-                max_length = length
-                new_chain = chain
+        return self.replace_longest(candidates), validated
 
-        # Replace our chain if we discovered a new, valid chain longer than ours
-        if new_chain:
-            self.blocks = new_chain.blocks
-            return True, validated
+    def _get_conflict_blocks(self, node: Node) -> Optional[JSON]:
+        """
+        Obtain the detailed blocks of this blockchain from a remote node for conflict resolution.
 
-        return False, validated
+        :returns: parsed listing of blocks, or ``None`` if the node could not provide them.
+        """
+        try:
+            response = NODE_SESSION.get(f"{node.url}/chains/{self.id!s}/blocks?detail=true", timeout=2)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            LOGGER.warning("Node [%s] is unresponsive for conflict resolution. Skipping it.", node.url)
+            return None
+
+        if response.status_code != 200:
+            LOGGER.warning("Node [%s] responded with invalid code [%s] during conflict resolution. "
+                           "Skipping it.", node, response.status_code)
+            return None
+        return orjson.loads(response.content)
+
+    def replace_longest(self, candidates: Iterable[Tuple[int, List[JSON]]]) -> bool:
+        """
+        Replace our chain with the longest valid one among candidate blocks that is longer than ours.
+
+        :param candidates: length and detailed blocks of chains obtained from other nodes.
+        :returns: True if our chain was replaced, False if not
+        """
+        # Validate the longest ones first to avoid loading and hashing any chain shorter than the one retained.
+        # Sorting is stable, so the first node that provided a chain of a given length keeps precedence.
+        # Mining is blocked meanwhile such that no block gets added to the chain that is being replaced.
+        with self.lock:
+            max_length = len(self.blocks)
+            for length, blocks in sorted(candidates, key=lambda candidate: candidate[0], reverse=True):
+                if length <= max_length:
+                    break
+                chain = Blockchain(chain=blocks, id=self.id)
+                if self.valid_chain(chain):
+                    self.blocks = chain.blocks
+                    return True
+        return False
 
     def verify_outdated(self, nodes: Iterable[Node]) -> Optional[bool]:
         """
@@ -890,14 +1081,13 @@ class Blockchain(WithID):
             - ``False`` otherwise
         """
         outdated = None
-        for node in nodes:
-            try:
-                resp = requests.get(f"{node.url}/chains/{self.id}/blocks?detail=true", timeout=2)
-            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
-                LOGGER.warning("Node [%s] is unresponsive for outdated verification. Skipping it.", node.url)
-                continue
-            if resp.status_code == 200:
-                body = resp.json()
+        # query all nodes concurrently, the result does not depend on the order in which they respond
+        checks = [NODE_POOL.submit(self._get_remote_blocks, node) for node in nodes]
+        try:
+            for check in as_completed(checks):
+                body = check.result()
+                if body is None:
+                    continue
                 length = len(self)
                 # current chain could be the most updated with other nodes being outdated
                 # therefore allow greater length for this node, but still validate hash
@@ -916,8 +1106,24 @@ class Blockchain(WithID):
                     if block.hash == other.hash:
                         return True
                     # otherwise, unknown conflict - cannot ensure if outdated or not
+        finally:
+            for check in checks:
+                check.cancel()  # not needed anymore if stopped early
         return outdated
 
+    def _get_remote_blocks(self, node: Node) -> Optional[JSON]:
+        """
+        Obtain the detailed blocks of this blockchain from a remote node, or ``None`` if they are unavailable.
+        """
+        try:
+            resp = NODE_SESSION.get(f"{node.url}/chains/{self.id}/blocks?detail=true", timeout=2)
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+            LOGGER.warning("Node [%s] is unresponsive for outdated verification. Skipping it.", node.url)
+            return None
+        if resp.status_code != 200:
+            return None
+        return orjson.loads(resp.content)
+
     def new_block(self, proof: int, previous_hash: Optional[str] = None) -> Block:
         """
         Create a new Block in the Blockchain
@@ -939,6 +1145,8 @@ class Blockchain(WithID):
         self.pending_consents = []
 
         self.blocks.append(block)
+        self._block_ids.append(block.id)
+        self._block_positions[block.id] = len(self.blocks) - 1
         return block
 
     def new_transaction(self, sender: str, recipient: str, amount: Union[int, float, Decimal]) -> int:
@@ -993,7 +1201,7 @@ class Blockchain(WithID):
         """
         return block.hash
 
-    def proof_of_work(self, last_block: Block) -> int:
+    def proof_of_work(self, last_block: Block) -> Tuple[int, str]:
         """
         Simple Proof of Work Algorithm:
 
@@ -1001,17 +1209,37 @@ class Blockchain(WithID):
          - Where p is the previous proof, and p' is the new proof
 
         :param last_block: last Block
-        :returns: computed proof
+        :returns: computed proof and hash of the last block it was computed against
         """
 
         last_proof = last_block["proof"]
         last_hash = self.hash(last_block)
 
+        # equivalent to 'valid_proof' checks, but with guess parts and secret encoded only once
+        # and the digest bytes validated directly instead of formatting them to hexadecimal
+        prefix = str(last_proof).encode("utf-8")
+        suffix = last_hash.encode("utf-8")
+        secret = get_hash_secret()
+        zero_bytes, half_byte = divmod(self.difficulty, 2)
         proof = 0
-        while not self.valid_proof(last_proof, proof, last_hash):
+        while True:
+            digest = hmac.digest(b"%s%d%s" % (prefix, proof, suffix), secret, "sha256")
+            if not any(digest[:zero_bytes]) and (not half_byte or digest[zero_bytes] < 0x10):
+                return proof, last_hash
             proof += 1
 
-        return proof
+    def mine_block(self) -> Block:
+        """
+        Mine the new block with pending changes by computing its proof of work against the last block and forging it.
+
+        The hash of the last block computed for the proof is directly reused as previous hash of the new block.
+        The chain :attr:`lock` is held meanwhile to avoid forging another block against the same last block.
+
+        :returns: New Block
+        """
+        with self.lock:
+            proof, previous_hash = self.proof_of_work(self.last_block)
+            return self.new_block(proof, previous_hash)
 
     def valid_proof(self, last_proof: int, proof: int, last_hash: str) -> bool:
         """
@@ -1033,6 +1261,15 @@ class MultiChain(dict):
     """
     Mapping of UUID to Blockchain with types validation and conversion.
     """
+    # shared by all instances such that a version also identifies the mapping it was obtained from
+    _versions = itertools.count(1)
+
+    def __init__(self, *args, **kwargs) -> None:
+        super(MultiChain, self).__init__(*args, **kwargs)
+        # block ID to the ID of the chain it was last found in, entries are validated against the chain on lookup
+        dict.__setattr__(self, "_block_index", {})
+        self._modified()
+
     def __setattr__(self, key, value):
         self[key] = value
 
@@ -1042,3 +1279,49 @@ class MultiChain(dict):
         if not isinstance(key, uuid.UUID):
             key = uuid.UUID(key)
         dict.__setitem__(self, key, value)
+        self._modified()
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self._modified()
+
+    def pop(self, *args):
+        chain = dict.pop(self, *args)
+        self._modified()
+        return chain
+
+    def clear(self) -> None:
+        dict.clear(self)
+        self._modified()
+
+    def update(self, *args, **kwargs) -> None:
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def _modified(self) -> None:
+        dict.__setattr__(self, "_version", next(MultiChain._versions))
+
+    @property
+    def version(self) -> int:
+        """
+        Identifier of the current set of blockchains, unique across all mappings, changed when any is added or removed.
+        """
+        return self._version
+
+    def find_block(self, block_id: uuid.UUID) -> Optional[Tuple[Block, Blockchain]]:
+        """
+        Obtain the block matching the ID and the blockchain it is part of, if any.
+        """
+        chain = self.get(self._block_index.get(block_id))
+        if chain is not None:
+            block = chain.find_block(block_id)
+            if block is not None:
+                return block, chain
+        # unknown or outdated reference (new block or chain replaced by consensus), search each chain index
+        for chain in self.values():
+            block = chain.find_block(block_id)
+            if block is not None:
+                self._block_index[block_id] = chain.id
+                return block, chain
+        self._block_index.pop(block_id, None)
+        return None
@@ -1,8 +1,9 @@
-from pydantic import UUID4
 from typing import Dict, List, Optional, Union
+from uuid import UUID
 
-AnyUUID = Union[UUID4, str]
-AnyRef = Union[str, int, UUID4]
+AnyUUID = Union[UUID, str]
+AnyRef = Union[str, int, UUID]
+IndexOrUUID = Union[UUID, int]  # order important, UUID validation must be attempted first
 Number = Union[int, float]
 JsonValue = Optional[Union[bool, str, Number]]
 JsonObject = Dict[str, "JSON"]
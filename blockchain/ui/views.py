@@ -4,18 +4,18 @@ from typing import Any, Dict, List, Optional
 from urllib.parse import urljoin
 
 from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import HTMLResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi_mako import FastAPIMako  # noqa
 from pydantic import UUID4
 
 import blockchain
-from blockchain import __meta__
 from blockchain.api import schemas
-from blockchain.api.chain import get_chain, get_chain_links, view_consents
+from blockchain.api.chain import get_chain, get_chain_links, get_consents
 from blockchain.impl import Blockchain
 from blockchain.typedefs import AnyUUID, JSON
-from blockchain.utils import get_links
+from blockchain.utils import get_links, get_package_version
 
 
 VIEWS = APIRouter(prefix="/ui")
@@ -27,7 +27,7 @@ def add_metadata(request: Request, data: Dict[str, Any]) -> Dict[str, Any]:
     data["node_shortcuts"] = []
     data["node_id"] = request.app.node.id
     data["node_url"] = request.app.node.url
-    data["version"] = __meta__["version"]
+    data["version"] = get_package_version()
     # generic CSS to applied on detected fields using 'get_styled_value' (see 'utils.mako')
     # right side should be one of many CSS classes defined in 'styles.css'
     data["styles"] = {
@@ -174,7 +174,7 @@ async def view_blocks(request: Request, chain_id: UUID4):
 @MAKO.template("ui/templates/view_consents.mako")
 async def display_consents(request: Request, chain_id: UUID4):
     chain = get_chain(request.app, chain_id)
-    data = await view_consents(request, chain.id)
+    data = await run_in_threadpool(get_consents, request.app, chain)
     data.update(get_chain_info(request, chain, strip_shortcut="consents"))
     data.update({
         "consent_fields": {
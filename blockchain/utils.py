@@ -1,16 +1,23 @@
 import copy
-import hashlib
+import functools
 import hmac
 import json
 import logging
 import os
+import re
 import sys
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin
-from typing import TYPE_CHECKING, Any, Coroutine, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Coroutine, Dict, List, Optional, Tuple, Union
 
-from fastapi import APIRouter, HTTPException, Request
+import orjson
+import requests
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse
+from requests.adapters import HTTPAdapter
 from requests_toolbelt import multipart
+from starlette.convertors import Convertor, register_url_convertor
 from uvicorn.config import LOGGING_CONFIG
 
 from blockchain.typedefs import JSON
@@ -20,6 +27,17 @@ if TYPE_CHECKING:
     from blockchain.app import BlockchainWebApp
 
 
+UUID_PATTERN = "[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}"
+UUID_REGEX = re.compile(rf"\A{UUID_PATTERN}\Z")
+
+# shared workers to dispatch concurrent requests to remote nodes
+NODE_POOL = ThreadPoolExecutor(max_workers=16, thread_name_prefix="blockchain-nodes")
+# persistent connections to remote nodes for blocking requests, sized for all workers of the shared pool
+NODE_SESSION = requests.Session()
+NODE_SESSION.mount("http://", HTTPAdapter(pool_maxsize=16))
+NODE_SESSION.mount("https://", HTTPAdapter(pool_maxsize=16))
+
+
 def get_logger(name: str,
                level: Optional[str] = None,
                force_stdout: bool = False,
@@ -98,11 +116,41 @@ def update_uvicorn_logger_config(logger: logging.Logger) -> dict:
 
 
 def is_uuid(obj: Any) -> bool:
-    try:
-        uuid.UUID(str(obj))
-    except (TypeError, ValueError):
-        return False
-    return True
+    if isinstance(obj, uuid.UUID):
+        return True
+    return UUID_REGEX.match(str(obj)) is not None
+
+
+def parse_index_or_uuid(value: str) -> Union[int, uuid.UUID]:
+    """
+    Parse a reference as numeric index or UUID according to its format, without attempting each conversion.
+
+    :raises ValueError: if the reference is neither a numeric index nor a UUID.
+    """
+    if value.isdigit() and value.isascii():  # cheaper check first, UUID always contain hyphens
+        return int(value)
+    if UUID_REGEX.match(value):
+        return uuid.UUID(value)  # cannot fail once matched
+    raise ValueError(f"Reference is neither a numeric index nor a UUID: [{value}]")
+
+
+class AnyRefConvertor(Convertor):
+    """
+    Path parameter convertor of an index or UUID reference resolved directly when matching routes.
+
+    Use as ``{<param>:anyref}`` in route paths.
+    Paths that do not match either format are not routed to the endpoint.
+    """
+    regex = f"[0-9]+|{UUID_PATTERN}"
+
+    def convert(self, value: str) -> Union[int, uuid.UUID]:
+        return parse_index_or_uuid(value)
+
+    def to_string(self, value: Union[int, uuid.UUID]) -> str:
+        return str(value)
+
+
+register_url_convertor("anyref", AnyRefConvertor())
 
 
 def url_strip_slash(path: str) -> str:
@@ -112,27 +160,128 @@ def url_strip_slash(path: str) -> str:
 
 
 def get_links(request: Request, scope: APIRouter, self=True) -> List["schemas.Link"]:
-    links = []
+    """
+    Obtain the links of routes under the scope, generated once per base URL and requested path.
+
+    Links are kept on the application serving the request. Copies are returned to allow callers to adjust them.
+    """
     path = url_strip_slash(request.url.path)
-    for rule in request.app.routes:
-        endpoint = url_strip_slash(rule.path)
-        # if the endpoint rule contains a path parameter(s), skip it since it cannot be generated
-        if endpoint.startswith(scope.prefix) and "{" not in rule.path:
+    base_url = str(request.base_url)
+    key = (base_url, path, scope.prefix, self)
+    links = request.app.links.get(key)
+    if links is None:
+        links = []
+        base_url = base_url.rstrip("/")
+        for endpoint, route_path in get_scope_routes(request.app, scope.prefix):
             rel = endpoint.split("/")[-1] if endpoint != path else "self"
             if rel == "self" and not self:
                 continue
             title = rel.replace("_", " ").capitalize()
-            href = request.url_for(rule.name)
-            links.append({"href": href, "rel": rel, "title": title})
-    return links  # type: ignore
+            links.append({"href": base_url + route_path, "rel": rel, "title": title})
+        request.app.links[key] = links
+    return [dict(link) for link in links]  # type: ignore
 
 
-def compute_hash(value: Any) -> str:
+def get_scope_routes(app: "BlockchainWebApp", prefix: str) -> List[Tuple[str, str]]:
+    """
+    Obtain the stripped endpoint and full path of application routes under the prefix, collected once from the router.
+
+    Routes with path parameter(s) are omitted since they cannot be generated without values.
+    Collected routes are kept on the application itself such that they are released along with it.
+    """
+    scope_routes = getattr(app, "scope_routes", None)
+    if scope_routes is None:
+        scope_routes = app.scope_routes = {}
+    routes = scope_routes.get(prefix)
+    if routes is None:
+        routes = scope_routes[prefix] = [
+            (url_strip_slash(route.path), route.path)
+            for route in app.routes
+            if url_strip_slash(route.path).startswith(prefix) and "{" not in route.path
+        ]
+    return routes
+
+
+def json_default(obj: Any) -> JSON:
+    """
+    Serialize objects not natively supported by :mod:`orjson`.
+
+    Objects with a cached JSON representation (e.g.: blocks) are returned directly without walking their items again.
+    Attributes are looked up on the type since missing attributes of :class:`addict.Dict` generate new items.
+    """
+    cls = type(obj)
+    if hasattr(cls, "as_json"):
+        return obj.as_json
+    if callable(getattr(cls, "json", None)):
+        return obj.json()
+    for builtin in (str, int, list, dict):  # other subclasses of builtin types
+        if isinstance(obj, builtin):
+            return builtin(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+# subclasses (e.g.: 'Base' dictionaries) must be passed to the default hook to employ their JSON representation
+json_dumps = functools.partial(orjson.dumps, default=json_default, option=orjson.OPT_PASSTHROUGH_SUBCLASS)
+
+
+class JSONResponse(ORJSONResponse):
+    """
+    JSON response rendered with :mod:`orjson`, supporting objects of the blockchain implementation.
+    """
+    def render(self, content: Any) -> bytes:
+        return json_dumps(content)
+
+
+def json_response(data: JSON, status_code: int = 200, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Generate a JSON response directly from serializable data.
+
+    Because a :class:`Response` is returned, the response model validation and encoding steps are skipped entirely.
+    """
+    return JSONResponse(data, status_code=status_code, headers=headers)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Verifies if the entity tag matches any of the ``If-None-Match`` request header values using weak comparison.
+    """
+    header = request.headers.get("If-None-Match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    etag = etag[2:] if etag.startswith("W/") else etag
+    for match in header.split(","):
+        match = match.strip()
+        if (match[2:] if match.startswith("W/") else match) == etag:
+            return True
+    return False
+
+
+@functools.lru_cache(maxsize=1)
+def get_package_version() -> str:
+    """
+    Obtain the version of the package, resolved from its metadata only when first requested.
+    """
+    from blockchain import __meta__  # import here to preserve the deferred metadata lookup of the package
+
+    return __meta__["Version"]
+
+
+def get_hash_secret() -> bytes:
+    """
+    Obtain the encoded secret of the application employed to compute hashes.
+    """
     from blockchain.app import APP  # import here to avoid circular import and passing secret everywhere
 
+    return str(APP.secret).encode("utf-8")
+
+
+def compute_hash(value: Any) -> str:
     e_value = str(value).encode("utf-8")
-    e_secret = str(APP.secret).encode("utf-8")
-    return hmac.new(e_value, msg=e_secret, digestmod=hashlib.sha256).hexdigest()
+    e_secret = get_hash_secret()
+    # one-shot digest computed entirely by OpenSSL (hardware accelerated SHA-256 when supported by the CPU)
+    return hmac.digest(e_value, e_secret, "sha256").hex()
 
 
 async def parse_multipart_consents(request: Request) -> JSON:
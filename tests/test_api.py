@@ -0,0 +1,145 @@
+import threading
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from blockchain.api.chain import generate_chains, get_chain_etag, get_consents
+from blockchain.api.nodes import add_nodes, confirm_node_ids
+from blockchain.app import create_app
+from blockchain.impl import Blockchain, ConsentAction, MultiChain, Node
+
+
+def test_confirm_node_ids(monkeypatch):
+    old_id = uuid.uuid4()
+    new_id = uuid.uuid4()
+    same_id = uuid.uuid4()
+    restarted = Node("http://localhost:5001", id=old_id)
+    unchanged = Node("http://localhost:5002", id=same_id)
+    remote_ids = {restarted.url: new_id, unchanged.url: same_id}
+    monkeypatch.setattr(Node, "fetch_id", lambda node: remote_ids[node.url])
+    app = SimpleNamespace(
+        nodes=[restarted, unchanged],
+        nodes_by_id={old_id: restarted, same_id: unchanged},
+        nodes_lock=threading.Lock(),
+        nodes_version=1,
+        db=None,
+    )
+    confirm_node_ids(app, app.nodes)
+    assert restarted["id"] == new_id
+    assert unchanged["id"] == same_id
+    assert app.nodes_by_id == {new_id: restarted, same_id: unchanged}
+    assert app.nodes_version == 2
+
+
+def test_add_nodes_conflict():
+    app = SimpleNamespace(
+        nodes=[],
+        nodes_by_id={},
+        nodes_by_url={},
+        nodes_lock=threading.Lock(),
+        nodes_version=0,
+    )
+    node = Node("http://localhost:5001", id=uuid.uuid4())
+    add_nodes(app, [node])
+    with pytest.raises(HTTPException) as exc:
+        add_nodes(app, [Node("http://localhost:5002", id=uuid.uuid4()), Node(node.url, id=uuid.uuid4())])
+    assert exc.value.status_code == 409
+    assert app.nodes == [node]  # none added when any conflicts
+    assert app.nodes_version == 1
+
+
+@pytest.fixture
+def chain_app():
+    app = create_app()
+    app.node = Node("http://localhost:5000", id=uuid.uuid4())
+    app.blockchains = MultiChain()
+    return app
+
+
+@pytest.mark.parametrize("path", ["/chains/{chain_id}", "/chains/{chain_id}/blocks"])
+def test_chain_not_modified(chain_app, path):
+    chain = Blockchain()
+    chain_app.blockchains[chain.id] = chain
+    client = TestClient(chain_app)
+    path = path.format(chain_id=chain.id)
+    resp = client.get(path)
+    assert resp.status_code == 200
+    etag = resp.headers["ETag"]
+    assert etag.startswith('W/"')
+
+    resp = client.get(path, headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.content == b""
+    assert resp.headers["ETag"] == etag
+
+    resp = client.get(path, headers={"If-None-Match": f'"other", {etag[2:]}'})
+    assert resp.status_code == 304
+
+    chain.new_block(proof=123, previous_hash="abc")
+    resp = client.get(path, headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+
+
+def test_chain_caches_per_app(chain_app):
+    chain = Blockchain()
+    chain_app.blockchains[chain.id] = chain
+    other_app = create_app()
+    other_app.blockchains = MultiChain()
+    other_app.blockchains[chain.id] = chain
+    resp = TestClient(chain_app).get(f"/chains/{chain.id}")
+    assert resp.status_code == 200
+    assert len(chain_app.chain_views) == 1
+    assert len(other_app.chain_views) == 0
+    assert len(other_app.chain_links) == 0
+
+
+def test_chain_etag():
+    chain = Blockchain()
+    etag = get_chain_etag(chain)
+    assert etag == f'W/"{chain.id}-{chain.blocks[0].id}-1"'
+    assert get_chain_etag(Blockchain(chain=chain.blocks, id=chain.id)) == etag  # same contents, as once reloaded
+    block = chain.new_block(proof=123, previous_hash="abc")
+    assert get_chain_etag(chain) == f'W/"{chain.id}-{block.id}-2"'
+    chain.blocks = chain.blocks[:1]  # replaced by consensus
+    assert get_chain_etag(chain) == etag
+
+
+def test_node_references(chain_app):
+    node_id = uuid.uuid4()
+    node = Node("http://localhost:5001", id=node_id)
+    add_nodes(chain_app, [node])
+    client = TestClient(chain_app)
+    for ref in ["0", str(node_id), str(node_id).upper()]:
+        resp = client.get(f"/nodes/{ref}")
+        assert resp.status_code == 200, ref
+        assert resp.json()["id"] == str(node_id)
+    assert client.get("/nodes/1").status_code == 400  # out of range index
+    assert client.get(f"/nodes/{uuid.uuid4()}").status_code == 404  # unknown node
+    for ref in ["-1", "abc", node_id.hex]:
+        assert client.get(f"/nodes/{ref}").status_code == 404, ref  # not routed
+
+
+def test_get_consents_concurrent():
+    chain = Blockchain()
+    for action in [ConsentAction.EMAIL_READ, ConsentAction.EMAIL_WRITE, ConsentAction.EMAIL_READ]:
+        chain.new_consent(action=action, consent=True, expire=None)
+        chain.new_block(proof=123, previous_hash="abc")
+    app = SimpleNamespace(nodes=[])
+    results = []
+    workers = [threading.Thread(target=lambda: results.append(get_consents(app, chain))) for _ in range(8)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert len(results) == 8
+    assert len(results[0]["changes"]) == 4  # initial and one per block, not duplicated by concurrent resolutions
+    assert len(chain.states.consent_change_history) == 4
+    assert all(result == results[0] for result in results)
+
+
+def test_generate_chains_invalid_candidates():
+    assert generate_chains({str(uuid.uuid4()): [(2, ["not-a-block", "other"])]}) == []
@@ -0,0 +1,61 @@
+import threading
+
+from blockchain.database import FileSystemDatabase
+from blockchain.impl import Blockchain
+
+
+class RecordingDatabase(FileSystemDatabase):
+    def __init__(self, *args, **kwargs):
+        super(RecordingDatabase, self).__init__(*args, **kwargs)
+        self.saved_chains = []
+        self.saved_blocks = []
+
+    def save_chain(self, chain):
+        self.saved_chains.append(chain.id)
+        super(RecordingDatabase, self).save_chain(chain)
+
+    def save_block(self, block, chain_id=None):
+        self.saved_blocks.append(block.id)
+        super(RecordingDatabase, self).save_block(block, chain_id=chain_id)
+
+
+def test_enqueue_save_coalesced(tmp_path):
+    db = RecordingDatabase(str(tmp_path))
+    db._writer = threading.current_thread()  # pretend a writer is running to flush explicitly
+    chain = Blockchain()
+    other = Blockchain()
+    db.enqueue_save(chain)
+    chain.new_block(proof=123, previous_hash="abc")
+    db.enqueue_save(chain)
+    db.enqueue_save(other)
+    assert db.saved_chains == []
+    db.flush()
+    assert sorted(db.saved_chains) == sorted([chain.id, other.id])
+    assert len(db.load_chain(chain.id)) == 2  # latest state written
+    db.flush()
+    assert len(db.saved_chains) == 2  # nothing pending anymore
+
+
+def test_enqueue_save_background_writer(tmp_path):
+    db = FileSystemDatabase(str(tmp_path))
+    chain = Blockchain()
+    db.enqueue_save(chain)
+    db.flush()  # as on shutdown, whether or not the writer already handled it
+    assert db._writer.daemon
+    assert db.load_chain(chain.id).block_ids == chain.block_ids
+
+
+def test_save_chain_skips_saved_blocks(tmp_path):
+    db = RecordingDatabase(str(tmp_path))
+    chain = Blockchain()
+    db.save_chain(chain)
+    assert db.saved_blocks == chain.block_ids
+    block = chain.new_block(proof=123, previous_hash="abc")
+    db.save_chain(chain)
+    assert db.saved_blocks == chain.block_ids  # only the new block saved again
+
+    loaded = RecordingDatabase(str(tmp_path))
+    loaded_chain = loaded.load_chain(chain.id)
+    assert loaded_chain.block_ids == [chain.blocks[0].id, block.id]
+    loaded.save_chain(loaded_chain)
+    assert loaded.saved_blocks == []  # blocks known to be stored since loaded
@@ -1,6 +1,22 @@
-from datetime import datetime
-
-from blockchain.impl import Base, WithDatetimeCreated, WithDatetimeExpire
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+import requests
+
+from blockchain.impl import (
+    Base,
+    Block,
+    Blockchain,
+    ConsentAction,
+    ConsentChange,
+    ConsentType,
+    MultiChain,
+    Node,
+    WithDatetimeCreated,
+    WithDatetimeExpire
+)
 
 
 class BaseTest(Base):
@@ -110,3 +126,121 @@ def test_with_times_properties():
     assert c == p.created  # not regen, stored on first create during init
     assert n < c
     assert e is None
+
+
+def test_block_json_cached():
+    block = Block(index=1, proof=123, previous_hash="abc")
+    data = block.as_json
+    assert data == block.json()
+    assert data is block.as_json  # not regenerated
+    block.clear_cache()
+    assert data is not block.as_json
+    assert data == block.as_json
+
+
+def test_blockchain_find_block():
+    chain = Blockchain()
+    block = chain.new_block(proof=123, previous_hash="abc")
+    assert isinstance(block.id, uuid.UUID)
+    assert chain.find_block(block.id) is block
+    assert chain.block_position(block.id) == 1
+    assert chain.find_block(chain.blocks[0].id) is chain.blocks[0]
+    assert chain.find_block(uuid.uuid4()) is None
+    assert chain.block_ids == [chain.blocks[0].id, block.id]
+
+
+def test_blockchain_summary_cached():
+    chain = Blockchain()
+    summary = chain.summary()
+    assert summary is chain.summary()
+    block = chain.new_block(proof=123, previous_hash="abc")
+    summary = chain.summary()
+    assert summary["blocks"] == [str(chain.blocks[0].id), str(block.id)]
+    assert summary is chain.summary()
+
+
+def test_blockchain_mine_block_concurrent(monkeypatch):
+    monkeypatch.setattr("blockchain.impl.get_hash_secret", lambda: b"secret")
+    monkeypatch.setattr("blockchain.utils.get_hash_secret", lambda: b"secret")
+    chain = Blockchain(difficulty=1)
+    miners = [threading.Thread(target=chain.mine_block) for _ in range(4)]
+    for miner in miners:
+        miner.start()
+    for miner in miners:
+        miner.join()
+    assert len(chain) == 5
+    assert chain.valid_chain(chain)  # each block mined against the previous one
+
+
+def test_consents_latest_expired_once():
+    chain = Blockchain()
+    chain.new_consent(action=ConsentAction.EMAIL_READ, consent=True, expire=datetime.utcnow() - timedelta(seconds=1))
+    block = chain.new_block(proof=123, previous_hash="abc")
+    consents = {consent.action: consent for consent in ConsentChange.latest(chain)}
+    assert consents[ConsentAction.EMAIL_READ].type == ConsentType.EXPIRED
+    assert consents[ConsentAction.EMAIL_READ].consent is False
+    assert block.consents[0] is consents[ConsentAction.EMAIL_READ]  # shared with the block that defined it
+
+    block_json = block.as_json
+    genesis_json = chain.blocks[0].as_json
+    ConsentChange.latest(chain)
+    assert block.as_json is block_json  # expiry already applied, representations remain valid
+    assert chain.blocks[0].as_json is genesis_json
+
+
+def test_multi_chain_find_block():
+    chain1 = Blockchain()
+    chain2 = Blockchain()
+    chains = MultiChain()
+    chains[chain1.id] = chain1
+    chains[chain2.id] = chain2
+    block = chain2.new_block(proof=123, previous_hash="abc")
+    assert chains.find_block(block.id) == (block, chain2)
+    assert chains.find_block(block.id)[1] is chain2  # indexed
+    assert chains.find_block(uuid.uuid4()) is None
+    chain2.blocks = chain2.blocks[:1]  # replaced by consensus
+    assert chains.find_block(block.id) is None
+
+
+def test_multi_chain_version():
+    chains = MultiChain()
+    other = MultiChain()
+    assert chains.version != other.version
+    version = chains.version
+    chain = Blockchain()
+    chains[chain.id] = chain
+    assert chains.version != version
+    version = chains.version
+    chains[chain.id].new_block(proof=123, previous_hash="abc")
+    assert chains.version == version  # only the set of chains is versioned
+    chains.update({uuid.uuid4(): Blockchain()})
+    assert chains.version != version
+    version = chains.version
+    chains.pop(chain.id)
+    assert chains.version != version
+
+
+def test_node_json_cached():
+    node_id = uuid.uuid4()
+    node = Node("http://localhost:5000", id=node_id)
+    data = node.json()
+    assert data == {"id": node_id, "url": "http://localhost:5000", "resolved": True}
+    assert data is node.json()  # not regenerated
+    node._id = None  # reset as when synchronization starts
+    assert node.json() == {"id": None, "url": "http://localhost:5000", "resolved": False}
+
+
+def test_node_normalize_url():
+    assert Node.normalize_url("http://192.168.0.5:5000") == "http://192.168.0.5:5000"
+    assert Node.normalize_url("http://192.168.0.5:5000/nodes") == "http://192.168.0.5:5000"
+    assert Node.normalize_url("192.168.0.5:5000") == "http://192.168.0.5:5000"
+
+
+@pytest.mark.parametrize("content", [b"not json", b"{}", b'{"node": "abc"}', b'{"node": null}', b"[]"])
+def test_node_fetch_id_invalid(monkeypatch, content):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = content
+    monkeypatch.setattr("blockchain.impl.NODE_SESSION.get", lambda *_, **__: response)
+    node = Node("http://localhost:5000", id=uuid.uuid4())
+    assert node.fetch_id() is None
@@ -0,0 +1,69 @@
+import re
+import uuid
+
+import pytest
+from starlette.requests import Request
+
+from blockchain.utils import AnyRefConvertor, etag_matches, parse_index_or_uuid
+
+REF_UUID = uuid.UUID("0c7a6d8e-3f1b-4c2a-9e5d-7b8f6a1c2d3e")
+
+
+def make_request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match is not None else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+@pytest.mark.parametrize("header, matches", [
+    (None, False),
+    ("", False),
+    ('W/"abc-1"', True),
+    ('"abc-1"', True),  # weak comparison ignores the weak indicator
+    ('W/"abc-2"', False),
+    ("*", True),
+    (' * ', True),
+    ('"other", W/"abc-1"', True),
+    ('"other",W/"abc-1" ,"more"', True),
+    ('"other", "more"', False),
+])
+def test_etag_matches(header, matches):
+    assert etag_matches(make_request(header), 'W/"abc-1"') is matches
+    assert etag_matches(make_request(header), '"abc-1"') is matches
+
+
+@pytest.mark.parametrize("ref, expect", [
+    ("0", 0),
+    ("12", 12),
+    (str(REF_UUID), REF_UUID),
+    (str(REF_UUID).upper(), REF_UUID),
+])
+def test_parse_index_or_uuid(ref, expect):
+    assert parse_index_or_uuid(ref) == expect
+    assert type(parse_index_or_uuid(ref)) is type(expect)
+
+
+@pytest.mark.parametrize("ref", [
+    "",
+    "-1",
+    "+1",
+    "1.5",
+    "\u0661",  # non-ASCII digit
+    "abc",
+    str(REF_UUID)[:-1],
+    str(REF_UUID) + "0",
+    REF_UUID.hex,  # without hyphens
+    f"{{{REF_UUID}}}",
+])
+def test_parse_index_or_uuid_invalid(ref):
+    with pytest.raises(ValueError):
+        parse_index_or_uuid(ref)
+
+
+def test_any_ref_convertor():
+    convertor = AnyRefConvertor()
+    regex = re.compile(f"^(?:{convertor.regex})$")
+    for ref in ["7", str(REF_UUID), str(REF_UUID).upper()]:
+        assert regex.match(ref)
+        assert convertor.to_string(convertor.convert(ref)) == ref.lower()
+    for ref in ["-1", "abc", REF_UUID.hex]:
+        assert not regex.match(ref)